@@ -1,6 +1,7 @@
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.engine import Connection
 from alembic import context
 import os
 import logging
@@ -68,6 +69,23 @@ def run_migrations_offline() -> None:
         logging.info("Offline migration transaction completed")
 
 
+def do_run_migrations(connection: Connection) -> None:
+    """Configure the context on a connection and run the migrations in one transaction"""
+    context.configure(
+        connection=connection, target_metadata=target_metadata
+    )
+
+    with context.begin_transaction():
+        logging.info("Starting online migration transaction")
+        # Short lock_timeout requested by the runner's lock guard
+        lock_timeout = config.attributes.get("lock_timeout")
+        if lock_timeout:
+            logging.info(f"Setting lock_timeout to {lock_timeout}")
+            context.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+        context.run_migrations()
+        logging.info("Online migration transaction completed")
+
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode.
 
@@ -77,6 +95,13 @@ def run_migrations_online() -> None:
     """
     logging.info("Running migrations in ONLINE mode")
     
+    # Reuse a connection handed over by the runner (streamed runs)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        logging.info("Using connection provided by the migration runner")
+        do_run_migrations(connection)
+        return
+    
     # Override the sqlalchemy.url with our environment variable
     configuration = config.get_section(config.config_ini_section)
     configuration["sqlalchemy.url"] = get_database_url()
@@ -90,14 +115,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         logging.info("Connected to database, starting migration context")
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
-
-        with context.begin_transaction():
-            logging.info("Starting online migration transaction")
-            context.run_migrations()
-            logging.info("Online migration transaction completed")
+        do_run_migrations(connection)
 
 
 if context.is_offline_mode():
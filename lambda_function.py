@@ -1,15 +1,32 @@
 """
 Minimal Lambda function for database day-2 operations
 """
+import os
+import tracemalloc
+
+# Trace before the heavy imports so their cost shows up as the "import" checkpoint
+if os.environ.get('MEMORY_PROFILE_IMPORTS') == '1':
+    tracemalloc.start()
+
 import json
 import logging
 import boto3
-from typing import Dict, Any
-from src.simple_migration_runner import apply_day2_operations
+from typing import Dict, Any, Optional
+from src.lock_guard import LockGuard
+from src.memory_profile import MemoryProfiler
+from src.retry_policy import RetryPolicy
+from src.simple_migration_runner import apply_day2_operations, stream_day2_operations
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Import-time memory, measured once per execution environment
+IMPORT_MEMORY: Optional[Dict[str, Any]] = None
+if tracemalloc.is_tracing():
+    IMPORT_MEMORY = MemoryProfiler(top_n=0).checkpoint("import")
+
+DEFAULT_ACCESS_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "access_spec.json")
+
 
 def get_database_connection_from_secret(secret_name: str) -> str:
     """
@@ -44,6 +61,35 @@ def get_database_connection_from_secret(secret_name: str) -> str:
         raise
 
 
+def run_streamed_migration(database_url: str, target_revision: str, **options: Any) -> Dict[str, Any]:
+    """
+    Run migrations emitting each progress event as a JSON log line
+    
+    The Python managed runtime has no response streaming, so events are
+    written to CloudWatch as they happen (for log subscriptions to act on)
+    and also returned in the response body.
+    
+    Args:
+        database_url: Database connection string
+        target_revision: Target revision to migrate to
+        **options: Retry policy, lock guard, profiler and release_memory,
+            as for ``apply_day2_operations``
+        
+    Returns:
+        Migration result with a ``progress_events`` list
+    """
+    events = []
+    result: Dict[str, Any] = {'success': False, 'error': 'Migration produced no result'}
+    for progress in stream_day2_operations(database_url, target_revision, **options):
+        logger.info(f"PROGRESS {json.dumps(progress, default=str)}")
+        if progress['event'] == 'run_finished':
+            result = dict(progress['result'])
+        else:
+            events.append(progress)
+    result['progress_events'] = events
+    return result
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for database day-2 operations
@@ -51,7 +97,15 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Expected event structure:
     {
         "secret_name": "rds-master-secret-name",
-        "action": "migrate"  # Optional, defaults to "migrate"
+        "action": "migrate",  # Optional, defaults to "migrate"
+        "stream_progress": false,  # Optional, log progress events as they happen
+        "retry": true,  # Optional, retry transient failures within the remaining time
+        "max_attempts": 5,  # Optional, attempts per operation when retrying
+        "profile_memory": false,  # Optional, report tracemalloc checkpoints
+        "release_memory": true,  # Optional, free caches and connections after the run
+        "lock_strategy": "wait",  # Optional, wait | abort | proceed | null (disabled)
+        "lock_timeout": "5s",  # Optional, lock_timeout while applying a revision
+        "max_lock_wait": 30  # Optional, seconds to wait for a safe window
     }
     """
     try:
@@ -75,7 +129,43 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Execute action
         if action == 'migrate':
-            result = apply_day2_operations(database_url, target_revision)
+            retry_policy = None
+            if event.get('retry', True):
+                retry_policy = RetryPolicy.from_lambda_context(
+                    context, max_attempts=event.get('max_attempts', 5)
+                )
+            lock_guard = None
+            if event.get('lock_strategy', 'wait'):
+                lock_guard = LockGuard.from_lambda_context(
+                    context,
+                    strategy=event.get('lock_strategy', 'wait'),
+                    lock_timeout=event.get('lock_timeout', '5s'),
+                    max_wait=event.get('max_lock_wait', 30)
+                )
+            profiler = None
+            if event.get('profile_memory', os.environ.get('MEMORY_PROFILE') == '1'):
+                profiler = MemoryProfiler()
+            options: Dict[str, Any] = {
+                'retry_policy': retry_policy,
+                'profiler': profiler,
+                'release_memory': event.get('release_memory', True),
+                'lock_guard': lock_guard
+            }
+            try:
+                if event.get('stream_progress', False):
+                    result = run_streamed_migration(database_url, target_revision, **options)
+                else:
+                    result = apply_day2_operations(database_url, target_revision, **options)
+            finally:
+                if profiler is not None:
+                    profiler.stop()
+            if profiler is not None and IMPORT_MEMORY is not None:
+                result.setdefault('memory', {})['import'] = IMPORT_MEMORY
+        elif action == 'reconcile_access':
+            from src.simple_migration_runner import SimpleMigrationRunner
+            runner = SimpleMigrationRunner(database_url)
+            spec_path = event.get('access_spec', DEFAULT_ACCESS_SPEC)
+            result = runner.reconcile_access(spec_path, dry_run=event.get('dry_run', False))
         elif action == 'status':
             # For status, just check connection
             from src.simple_migration_runner import SimpleMigrationRunner
@@ -85,7 +175,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             result = {
                 'success': False,
                 'error': f'Unknown action: {action}',
-                'message': 'Valid actions are: migrate, status'
+                'message': 'Valid actions are: migrate, reconcile_access, status'
             }
         
         return {
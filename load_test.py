@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Local load-test harness for the database day-2 operations Lambda function
+Runs N concurrent simulated invocations against the local PostgreSQL container
+through a fault-injecting TCP proxy - no AWS access needed
+"""
+import json
+import math
+import sys
+import time
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from test_lambda import LOCAL_SECRET, MockContext, mock_secrets_manager  # noqa: E402
+
+# Keep 50 concurrent invocations readable: only warnings reach the console
+for handler in logging.getLogger().handlers:
+    handler.setLevel(logging.WARNING)
+
+ADMIN_URL = "postgresql://{username}:{password}@{host}:{port}/{dbname}".format(**LOCAL_SECRET)
+CONTAINER_NAME = "alembic-postgres"
+
+
+class FaultProxy:
+    """TCP proxy in front of PostgreSQL that can add latency and kill connections"""
+
+    def __init__(self, upstream_host: str, upstream_port: int, latency_ms: float = 0.0):
+        self.upstream = (upstream_host, upstream_port)
+        self.latency = latency_ms / 1000.0
+        self.kills = 0
+        self._sockets: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen(128)
+        self.port = self._listener.getsockname()[1]
+        self._running = True
+
+    def start(self) -> "FaultProxy":
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._running = False
+        self._listener.close()
+        self.kill_connections(count_kill=False)
+
+    def kill_connections(self, count_kill: bool = True) -> int:
+        """Abruptly close every proxied connection, like a failover would"""
+        with self._lock:
+            victims, self._sockets = self._sockets, []
+        for sock in victims:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if count_kill:
+            self.kills += len(victims) // 2
+        return len(victims) // 2
+
+    def _accept_loop(self) -> None:
+        while self._running:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            try:
+                upstream = socket.create_connection(self.upstream)
+            except OSError:
+                client.close()
+                continue
+            with self._lock:
+                self._sockets.extend([client, upstream])
+            threading.Thread(target=self._pipe, args=(client, upstream), daemon=True).start()
+            threading.Thread(target=self._pipe, args=(upstream, client), daemon=True).start()
+
+    def _pipe(self, source: socket.socket, destination: socket.socket) -> None:
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                if self.latency:
+                    time.sleep(self.latency)
+                destination.sendall(data)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._sockets = [sock for sock in self._sockets if sock not in (source, destination)]
+            for sock in (source, destination):
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+
+
+class LockWaitMonitor:
+    """Samples pg_stat_activity for sessions waiting on heavyweight locks"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.lock_wait_seconds = 0.0
+        self.max_waiters = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "LockWaitMonitor":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        from sqlalchemy import create_engine, text
+        engine = create_engine(ADMIN_URL, pool_pre_ping=True)
+        query = text("SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock'")
+        while not self._stop.wait(self.interval):
+            try:
+                with engine.connect() as connection:
+                    waiters = connection.execute(query).scalar() or 0
+            except Exception:
+                # Database restarting - nothing to sample
+                continue
+            self.lock_wait_seconds += waiters * self.interval
+            self.max_waiters = max(self.max_waiters, waiters)
+        engine.dispose()
+
+
+def prepare_databases(count: int) -> List[str]:
+    """Create (or reuse) the target databases invocations will share"""
+    from sqlalchemy import create_engine, text
+    names = [LOCAL_SECRET['dbname']] + [f"{LOCAL_SECRET['dbname']}_{i}" for i in range(1, count)]
+    engine = create_engine(ADMIN_URL, isolation_level="AUTOCOMMIT")
+    with engine.connect() as connection:
+        existing = {row[0] for row in connection.execute(text("SELECT datname FROM pg_database"))}
+        for name in names:
+            if name not in existing:
+                connection.execute(text(f'CREATE DATABASE "{name}"'))
+    engine.dispose()
+    return names
+
+
+def run_invocation(index: int, dbname: str, proxy_port: int, event: Dict[str, Any],
+                   timeout_seconds: float) -> Dict[str, Any]:
+    """Simulate one Lambda invocation in a fresh worker process"""
+    from lambda_function import lambda_handler
+
+    secret = dict(LOCAL_SECRET, host='127.0.0.1', port=proxy_port, dbname=dbname)
+    started = time.monotonic()
+    try:
+        with mock_secrets_manager(secret):
+            response = lambda_handler(event, MockContext(timeout_seconds))
+        body = json.loads(response['body'])
+    except Exception as e:
+        body = {'success': False, 'error': f"{type(e).__name__}: {e}"}
+        response = {'statusCode': 500}
+    return {
+        'index': index,
+        'database': dbname,
+        'latency': time.monotonic() - started,
+        'status_code': response['statusCode'],
+        'success': bool(body.get('success')),
+        'error': body.get('error'),
+        'retries': len(body.get('retries', []))
+    }
+
+
+def inject_faults(proxy: FaultProxy, kill_every: Optional[float], restart_after: Optional[float],
+                  stop: threading.Event) -> None:
+    """Kill proxied connections periodically and/or restart the container once"""
+    started = time.monotonic()
+    restarted = False
+    kill_rounds = 0
+    while not stop.wait(0.1):
+        elapsed = time.monotonic() - started
+        if restart_after is not None and not restarted and elapsed >= restart_after:
+            print(f"💥 Restarting {CONTAINER_NAME} at {elapsed:.1f}s")
+            subprocess.run(["docker", "restart", CONTAINER_NAME], check=False, capture_output=True)
+            restarted = True
+        if kill_every and elapsed >= kill_every * (kill_rounds + 1):
+            killed = proxy.kill_connections()
+            kill_rounds += 1
+            print(f"💥 Killed {killed} connection(s) at {elapsed:.1f}s")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(results: List[Dict[str, Any]], wall_time: float, proxy: FaultProxy,
+              monitor: LockWaitMonitor) -> Dict[str, Any]:
+    """Aggregate invocation results into the load-test report"""
+    latencies = [result['latency'] for result in results]
+    failure_modes: Dict[str, int] = {}
+    for result in results:
+        if not result['success']:
+            mode = (result['error'] or 'unknown error').strip().splitlines()[0][:120]
+            failure_modes[mode] = failure_modes.get(mode, 0) + 1
+    return {
+        'invocations': len(results),
+        'succeeded': sum(1 for result in results if result['success']),
+        'failed': sum(1 for result in results if not result['success']),
+        'wall_time': round(wall_time, 3),
+        'throughput_per_second': round(len(results) / wall_time, 3) if wall_time else 0.0,
+        'latency_p50': round(percentile(latencies, 50), 3),
+        'latency_p95': round(percentile(latencies, 95), 3),
+        'latency_p99': round(percentile(latencies, 99), 3),
+        'latency_max': round(max(latencies, default=0.0), 3),
+        'retries': sum(result['retries'] for result in results),
+        'lock_wait_seconds': round(monitor.lock_wait_seconds, 3),
+        'max_lock_waiters': monitor.max_waiters,
+        'connections_killed': proxy.kills,
+        'failure_modes': failure_modes
+    }
+
+
+def load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the load test and return the report"""
+    print("🚀 Database Day-2 Operations Lambda Load Test")
+    print("=" * 45)
+
+    databases = prepare_databases(args.databases)
+    print(f"🗄️  Target databases: {', '.join(databases)}")
+
+    # One process per invocation, like separate Lambda execution environments.
+    # "spawn" (fork is unsupported with max_tasks_per_child), and the pool is
+    # created before any thread starts so workers never inherit their state.
+    mp_context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=args.concurrency, mp_context=mp_context,
+                               max_tasks_per_child=1)
+
+    proxy = FaultProxy(LOCAL_SECRET['host'], LOCAL_SECRET['port'], args.latency_ms).start()
+    print(f"🔌 Fault proxy on 127.0.0.1:{proxy.port} (latency {args.latency_ms}ms)")
+
+    event = {
+        "secret_name": "test-rds-secret",
+        "action": args.action,
+        "target_revision": args.target,
+        "retry": not args.no_retry
+    }
+
+    monitor = LockWaitMonitor().start()
+    stop_faults = threading.Event()
+    fault_thread = threading.Thread(
+        target=inject_faults,
+        args=(proxy, args.kill_every, args.restart_after, stop_faults),
+        daemon=True
+    )
+    fault_thread.start()
+
+    print(f"🧪 {args.invocations} invocation(s), concurrency {args.concurrency}")
+    started = time.monotonic()
+    with pool:
+        futures = [
+            pool.submit(run_invocation, index, databases[index % len(databases)],
+                        proxy.port, event, args.timeout)
+            for index in range(args.invocations)
+        ]
+        results = [future.result() for future in futures]
+    wall_time = time.monotonic() - started
+
+    stop_faults.set()
+    fault_thread.join()
+    monitor.stop()
+    proxy.stop()
+    return summarize(results, wall_time, proxy, monitor)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load-test the Lambda function against local PostgreSQL')
+    parser.add_argument('--invocations', '-n', type=int, default=50,
+                        help='Number of simulated invocations (default: 50)')
+    parser.add_argument('--concurrency', '-c', type=int, default=50,
+                        help='Invocations running at the same time (default: 50)')
+    parser.add_argument('--databases', '-d', type=int, default=5,
+                        help='Databases the invocations are spread over (default: 5)')
+    parser.add_argument('--target', '-t', default='head',
+                        help='Target revision to migrate to (default: head)')
+    parser.add_argument('--action', default='migrate',
+                        help='Lambda action to invoke (default: migrate)')
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='Latency added to every proxied packet (default: 0)')
+    parser.add_argument('--kill-every', type=float, default=None,
+                        help='Kill all proxied connections every N seconds')
+    parser.add_argument('--restart-after', type=float, default=None,
+                        help='Restart the PostgreSQL container after N seconds')
+    parser.add_argument('--timeout', type=float, default=900,
+                        help='Simulated Lambda timeout in seconds (default: 900)')
+    parser.add_argument('--no-retry', action='store_true',
+                        help='Disable the retry policy in the invocations')
+
+    args = parser.parse_args()
+
+    try:
+        report = load_test(args)
+    except Exception as e:
+        print(f"❌ Load test failed: {e}")
+        print("💡 Make sure to run 'make db-up' first")
+        sys.exit(1)
+
+    print("📊 Report:")
+    print(json.dumps(report, indent=2))
+    print(f"\n✨ {report['succeeded']}/{report['invocations']} succeeded, "
+          f"p99 {report['latency_p99']}s, {report['throughput_per_second']} invocations/s")
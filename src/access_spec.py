@@ -0,0 +1,245 @@
+"""
+Declarative access management for database day-2 operations
+Diffs a JSON/YAML spec of roles, schemas and privileges against the live
+catalog and emits only the statements needed to converge
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, List, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+_preparer = postgresql.dialect().identifier_preparer
+
+# Privilege sets "ALL" expands to, per object kind
+ALL_PRIVILEGES = {
+    'schema': ['USAGE', 'CREATE'],
+    'tables': ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'TRUNCATE', 'REFERENCES', 'TRIGGER'],
+    'sequences': ['USAGE', 'SELECT', 'UPDATE'],
+}
+ALL_PRIVILEGES['default_tables'] = ALL_PRIVILEGES['tables']
+ALL_PRIVILEGES['default_sequences'] = ALL_PRIVILEGES['sequences']
+
+# Stands in for passwords in dry-run plans, which never read the secrets
+REDACTED_PASSWORD = "********"
+
+# pg_default_acl object type codes for the default privilege kinds
+_DEFAULT_ACL_TYPES = {'default_tables': 'r', 'default_sequences': 'S'}
+
+_ROLES_SQL = "SELECT rolname, rolcanlogin FROM pg_roles"
+
+_MEMBERSHIPS_SQL = """
+    SELECT r.rolname AS role_name, m.rolname AS member_name
+    FROM pg_auth_members am
+    JOIN pg_roles r ON r.oid = am.roleid
+    JOIN pg_roles m ON m.oid = am.member
+"""
+
+_SCHEMA_ACL_SQL = """
+    SELECT n.nspname, COALESCE(r.rolname, 'PUBLIC') AS grantee, a.privilege_type
+    FROM pg_namespace n
+    CROSS JOIN LATERAL aclexplode(n.nspacl) a
+    LEFT JOIN pg_roles r ON r.oid = a.grantee
+"""
+
+# Per schema: how many relations exist and how many carry each grant
+_RELATION_ACL_SQL = """
+    WITH rels AS (
+        SELECT c.oid, c.relacl, n.nspname,
+               CASE WHEN c.relkind = 'S' THEN 'sequences' ELSE 'tables' END AS kind
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f', 'S')
+    )
+    SELECT rels.nspname, rels.kind, NULL AS grantee, NULL AS privilege_type,
+           COUNT(*) AS relation_count
+    FROM rels
+    GROUP BY rels.nspname, rels.kind
+    UNION ALL
+    SELECT rels.nspname, rels.kind, r.rolname, a.privilege_type, COUNT(*)
+    FROM rels
+    CROSS JOIN LATERAL aclexplode(rels.relacl) a
+    JOIN pg_roles r ON r.oid = a.grantee
+    GROUP BY rels.nspname, rels.kind, r.rolname, a.privilege_type
+"""
+
+_DEFAULT_ACL_SQL = """
+    SELECT n.nspname, d.defaclobjtype, r.rolname, a.privilege_type
+    FROM pg_default_acl d
+    JOIN pg_namespace n ON n.oid = d.defaclnamespace
+    CROSS JOIN LATERAL aclexplode(d.defaclacl) a
+    JOIN pg_roles r ON r.oid = a.grantee
+    WHERE d.defaclrole = (SELECT oid FROM pg_roles WHERE rolname = current_user)
+"""
+
+
+def load_access_spec(path: str) -> Dict[str, Any]:
+    """Load an access spec from a JSON or YAML file"""
+    with open(path) as spec_file:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required for YAML access specs, use JSON instead")
+            spec = yaml.safe_load(spec_file)
+        else:
+            spec = json.load(spec_file)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Access spec {path} must be a mapping")
+    return spec
+
+
+def fetch_catalog_state(connection: Connection) -> Dict[str, Any]:
+    """Read roles, memberships and privileges from the catalog in bulk"""
+    roles = {row.rolname: row.rolcanlogin for row in connection.execute(text(_ROLES_SQL))}
+    memberships = {
+        (row.role_name, row.member_name)
+        for row in connection.execute(text(_MEMBERSHIPS_SQL))
+    }
+    schemas: Dict[str, Set[Tuple[str, str]]] = {}
+    for row in connection.execute(text(_SCHEMA_ACL_SQL)):
+        schemas.setdefault(row.nspname, set()).add((row.grantee, row.privilege_type))
+    for row in connection.execute(text("SELECT nspname FROM pg_namespace")):
+        schemas.setdefault(row.nspname, set())
+
+    relation_counts: Dict[Tuple[str, str], int] = {}
+    relation_grants: Dict[Tuple[str, str, str, str], int] = {}
+    for row in connection.execute(text(_RELATION_ACL_SQL)):
+        if row.grantee is None:
+            relation_counts[(row.nspname, row.kind)] = row.relation_count
+        else:
+            key = (row.nspname, row.kind, row.grantee, row.privilege_type)
+            relation_grants[key] = row.relation_count
+
+    default_grants = {
+        (row.nspname, row.defaclobjtype, row.rolname, row.privilege_type)
+        for row in connection.execute(text(_DEFAULT_ACL_SQL))
+    }
+
+    return {
+        'roles': roles,
+        'memberships': memberships,
+        'schemas': schemas,
+        'relation_counts': relation_counts,
+        'relation_grants': relation_grants,
+        'default_grants': default_grants,
+    }
+
+
+def _expand(kind: str, privileges: List[str]) -> List[str]:
+    """Upper-case privileges and expand ALL for the given object kind"""
+    expanded: List[str] = []
+    for privilege in privileges:
+        privilege = privilege.upper()
+        # Privileges are interpolated into GRANT statements, only allow known names
+        if privilege != 'ALL' and privilege not in ALL_PRIVILEGES[kind]:
+            raise ValueError(f"Unknown {kind} privilege {privilege!r}, expected one of {ALL_PRIVILEGES[kind]}")
+        for item in ALL_PRIVILEGES[kind] if privilege == 'ALL' else [privilege]:
+            if item not in expanded:
+                expanded.append(item)
+    return expanded
+
+
+def _is_granted(state: Dict[str, Any], schema: str, kind: str, role: str, privilege: str) -> bool:
+    """Check whether a privilege is already present in the catalog snapshot"""
+    if kind == 'schema':
+        return (role, privilege) in state['schemas'].get(schema, set())
+    if kind in _DEFAULT_ACL_TYPES:
+        return (schema, _DEFAULT_ACL_TYPES[kind], role, privilege) in state['default_grants']
+    # ON ALL TABLES/SEQUENCES holds when every existing relation carries it
+    relation_kind = 'sequences' if kind == 'sequences' else 'tables'
+    total = state['relation_counts'].get((schema, relation_kind), 0)
+    return bool(state['relation_grants'].get((schema, relation_kind, role, privilege), 0) >= total)
+
+
+def _grant_statement(schema: str, kind: str, role: str, privileges: List[str]) -> str:
+    """Render the GRANT statement for a privilege kind"""
+    schema_q = _preparer.quote(schema)
+    role_q = _preparer.quote(role)
+    joined = ", ".join(privileges)
+    if kind == 'schema':
+        return f"GRANT {joined} ON SCHEMA {schema_q} TO {role_q}"
+    if kind == 'tables':
+        return f"GRANT {joined} ON ALL TABLES IN SCHEMA {schema_q} TO {role_q}"
+    if kind == 'sequences':
+        return f"GRANT {joined} ON ALL SEQUENCES IN SCHEMA {schema_q} TO {role_q}"
+    target = 'TABLES' if kind == 'default_tables' else 'SEQUENCES'
+    return f"ALTER DEFAULT PRIVILEGES IN SCHEMA {schema_q} GRANT {joined} ON {target} TO {role_q}"
+
+
+def plan_access_statements(spec: Dict[str, Any], state: Dict[str, Any],
+                           dry_run: bool = False) -> Dict[str, List[Any]]:
+    """Diff the spec against a catalog snapshot and return the missing statements
+
+    Reconciliation is additive: roles, schemas, memberships and privileges
+    absent from the spec are left untouched. Passwords are only set when a
+    login role is created, and those statements are returned separately under
+    ``secret_statements`` as ``(statement, (password,))`` pairs, so the
+    password is only ever a bound parameter and never logged. A dry run never
+    reads the password variables and plans a redacted placeholder instead.
+    """
+    statements: List[str] = []
+    secret_statements: List[Tuple[str, Tuple[str]]] = []
+    roles = dict(state['roles'])
+
+    for role in spec.get('roles', []):
+        name = role['name']
+        login = bool(role.get('login', False))
+        if name in roles:
+            if login and not roles[name]:
+                statements.append(f"ALTER ROLE {_preparer.quote(name)} LOGIN")
+            continue
+        statements.append(f"CREATE ROLE {_preparer.quote(name)} {'LOGIN' if login else 'NOLOGIN'}")
+        roles[name] = login
+        password_env = role.get('password_env')
+        if login and password_env:
+            password = REDACTED_PASSWORD if dry_run else os.environ.get(password_env)
+            if password is None:
+                raise ValueError(f"Environment variable {password_env} for role {name} is not set")
+            # pyformat placeholder, so a literal % in the role name must be doubled
+            role_q = _preparer.quote(name).replace('%', '%%')
+            secret_statements.append((f"ALTER ROLE {role_q} PASSWORD %s", (password,)))
+
+    for schema in spec.get('schemas', []):
+        name = schema['name']
+        if name not in state['schemas']:
+            statements.append(f"CREATE SCHEMA IF NOT EXISTS {_preparer.quote(name)}")
+        if schema.get('revoke_public') and any(
+            grantee == 'PUBLIC' for grantee, _ in state['schemas'].get(name, set())
+        ):
+            statements.append(f"REVOKE ALL ON SCHEMA {_preparer.quote(name)} FROM PUBLIC")
+
+    for role in spec.get('roles', []):
+        for parent in role.get('member_of', []):
+            if (parent, role['name']) not in state['memberships']:
+                statements.append(f"GRANT {_preparer.quote(parent)} TO {_preparer.quote(role['name'])}")
+
+    for schema in spec.get('schemas', []):
+        for grant in schema.get('grants', []):
+            for kind in ALL_PRIVILEGES:
+                missing = [
+                    privilege for privilege in _expand(kind, grant.get(kind, []))
+                    if not _is_granted(state, schema['name'], kind, grant['role'], privilege)
+                ]
+                if missing:
+                    statements.append(_grant_statement(schema['name'], kind, grant['role'], missing))
+
+    return {'statements': statements, 'secret_statements': secret_statements}
+
+
+def apply_access_plan(connection: Connection, plan: Dict[str, List[Any]]) -> None:
+    """Execute a plan in one round-trip, secrets through the raw DBAPI cursor"""
+    if plan['statements']:
+        connection.exec_driver_sql(";\n".join(plan['statements']))
+    if plan['secret_statements']:
+        # Bypass SQLAlchemy statement logging so passwords never reach the logs
+        cursor = connection.connection.cursor()
+        try:
+            for statement, parameters in plan['secret_statements']:
+                cursor.execute(statement, parameters)
+        finally:
+            cursor.close()
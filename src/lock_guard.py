@@ -0,0 +1,304 @@
+"""
+Pre-flight lock conflict detection for migrations running against live traffic
+Estimates which relations a revision will lock, checks pg_locks/pg_stat_activity
+for sessions that would block it, and applies it with a short lock_timeout
+"""
+import io
+import re
+import time
+import logging
+import contextlib
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from src.retry_policy import error_sqlstate
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LOCK_NOT_AVAILABLE = '55P03'
+
+LOCK_STRATEGIES = ('wait', 'abort', 'proceed')
+
+# Which held modes block a request for each mode (PostgreSQL lock conflict table)
+LOCK_CONFLICTS = {
+    'AccessShareLock': {'AccessExclusiveLock'},
+    'RowShareLock': {'ExclusiveLock', 'AccessExclusiveLock'},
+    'RowExclusiveLock': {'ShareLock', 'ShareRowExclusiveLock', 'ExclusiveLock', 'AccessExclusiveLock'},
+    'ShareUpdateExclusiveLock': {
+        'ShareUpdateExclusiveLock', 'ShareLock', 'ShareRowExclusiveLock',
+        'ExclusiveLock', 'AccessExclusiveLock'
+    },
+    'ShareLock': {
+        'RowExclusiveLock', 'ShareUpdateExclusiveLock', 'ShareRowExclusiveLock',
+        'ExclusiveLock', 'AccessExclusiveLock'
+    },
+    'ShareRowExclusiveLock': {
+        'RowExclusiveLock', 'ShareUpdateExclusiveLock', 'ShareLock',
+        'ShareRowExclusiveLock', 'ExclusiveLock', 'AccessExclusiveLock'
+    },
+    'ExclusiveLock': {
+        'RowShareLock', 'RowExclusiveLock', 'ShareUpdateExclusiveLock', 'ShareLock',
+        'ShareRowExclusiveLock', 'ExclusiveLock', 'AccessExclusiveLock'
+    },
+    'AccessExclusiveLock': {
+        'AccessShareLock', 'RowShareLock', 'RowExclusiveLock', 'ShareUpdateExclusiveLock',
+        'ShareLock', 'ShareRowExclusiveLock', 'ExclusiveLock', 'AccessExclusiveLock'
+    },
+}
+_LOCK_STRENGTH = list(LOCK_CONFLICTS)
+
+_NAME = r'(?:"[^"]+"|[A-Za-z_][\w$]*)'
+_QUALIFIED = rf'({_NAME}(?:\.{_NAME})?)'
+
+# (pattern, lock mode) - the relation is the first group; "schema" patterns
+# match every relation in the schema. GRANT/REVOKE is a conservative estimate.
+_LOCK_PATTERNS: List[Tuple["re.Pattern[str]", str, bool]] = [
+    (re.compile(rf'\bALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?{_QUALIFIED}', re.I), 'AccessExclusiveLock', False),
+    (re.compile(rf'\bDROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?{_QUALIFIED}', re.I), 'AccessExclusiveLock', False),
+    (re.compile(rf'\bTRUNCATE\s+(?:TABLE\s+)?(?:ONLY\s+)?{_QUALIFIED}', re.I), 'AccessExclusiveLock', False),
+    (re.compile(rf'\bCREATE\s+(?:UNIQUE\s+)?INDEX\s+(?!CONCURRENTLY)(?:IF\s+NOT\s+EXISTS\s+)?(?:{_NAME}\s+)?ON\s+(?:ONLY\s+)?{_QUALIFIED}', re.I), 'ShareLock', False),
+    (re.compile(rf'\bCREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:{_NAME}\s+)?ON\s+(?:ONLY\s+)?{_QUALIFIED}', re.I), 'ShareUpdateExclusiveLock', False),
+    (re.compile(rf'\bREFERENCES\s+{_QUALIFIED}', re.I), 'ShareRowExclusiveLock', False),
+    (re.compile(rf'\b(?:GRANT|REVOKE)\s+[\w\s,]+?\s+ON\s+(?:TABLE\s+)?(?!(?:ALL|SCHEMAS?|SEQUENCES?|DATABASE|FUNCTIONS?|PROCEDURE|ROUTINES?|TABLES|TYPES?|DOMAIN|LANGUAGE|LARGE|FOREIGN|TABLESPACE)\b){_QUALIFIED}\s+(?:TO|FROM)\b', re.I), 'ShareUpdateExclusiveLock', False),
+    (re.compile(rf'\b(?:GRANT|REVOKE)\s+[\w\s,]+?\s+ON\s+ALL\s+TABLES\s+IN\s+SCHEMA\s+({_NAME}(?:\s*,\s*{_NAME})*)', re.I), 'ShareUpdateExclusiveLock', True),
+]
+_LOCK_TABLE = re.compile(rf'\bLOCK\s+(?:TABLE\s+)?(?:ONLY\s+)?{_QUALIFIED}(?:\s+IN\s+([A-Z ]+?)\s+MODE)?', re.I)
+
+_BLOCKERS_SQL = """
+    SELECT l.pid, n.nspname, c.relname, l.mode, l.granted, a.state, a.usename,
+           EXTRACT(EPOCH FROM now() - a.xact_start) AS xact_age,
+           left(a.query, 200) AS query
+    FROM pg_locks l
+    JOIN pg_class c ON c.oid = l.relation
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_activity a ON a.pid = l.pid
+    WHERE l.locktype = 'relation'
+      AND l.pid <> pg_backend_pid()
+      AND a.backend_type = 'client backend'
+      AND l.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND n.nspname = ANY(:schemas)
+"""
+
+
+class LockContentionError(RuntimeError):
+    """Raised when a revision cannot get its locks within the lock strategy"""
+
+
+def _unquote(name: str) -> str:
+    return name[1:-1] if name.startswith('"') else name.lower()
+
+
+def _split_relation(qualified: str) -> Tuple[str, str]:
+    """Split ``schema.table`` (public when unqualified) into unquoted parts"""
+    parts = re.findall(_NAME, qualified)
+    if len(parts) == 1:
+        return 'public', _unquote(parts[0])
+    return _unquote(parts[0]), _unquote(parts[1])
+
+
+def _stronger(current: Optional[str], candidate: str) -> str:
+    if current is None:
+        return candidate
+    return max(current, candidate, key=_LOCK_STRENGTH.index)
+
+
+def estimate_locks(sql: str) -> Dict[Tuple[str, str], str]:
+    """Estimate the relation locks a block of SQL takes
+
+    Keys are ``(schema, relation)``; a relation of ``*`` stands for every
+    relation in the schema. Values are the strongest lock mode needed.
+    """
+    targets: Dict[Tuple[str, str], str] = {}
+    for pattern, mode, schema_wide in _LOCK_PATTERNS:
+        for match in pattern.finditer(sql):
+            if schema_wide:
+                for schema in re.findall(_NAME, match.group(1)):
+                    key = (_unquote(schema), '*')
+                    targets[key] = _stronger(targets.get(key), mode)
+            else:
+                key = _split_relation(match.group(1))
+                targets[key] = _stronger(targets.get(key), mode)
+    for match in _LOCK_TABLE.finditer(sql):
+        requested = (match.group(2) or 'ACCESS EXCLUSIVE').title().replace(' ', '') + 'Lock'
+        mode = requested if requested in LOCK_CONFLICTS else 'AccessExclusiveLock'
+        key = _split_relation(match.group(1))
+        targets[key] = _stronger(targets.get(key), mode)
+    return targets
+
+
+def render_revision_sql(script: ScriptDirectory, rev_id: str) -> str:
+    """Render a revision's upgrade() as SQL text without touching the database"""
+    buffer = io.StringIO()
+    context = MigrationContext.configure(
+        dialect_name="postgresql", opts={'as_sql': True, 'output_buffer': buffer}
+    )
+    try:
+        # Revisions print completion messages - keep them out of a dry render
+        with contextlib.redirect_stdout(io.StringIO()):
+            with Operations.context(context):
+                script.get_revision(rev_id).module.upgrade()
+    except Exception as e:
+        # e.g. revisions that inspect the live database through op.get_bind()
+        logger.warning(f"Could not render revision {rev_id} offline, lock estimate unavailable: {e}")
+        return ""
+    return buffer.getvalue()
+
+
+def find_blockers(connection: Connection, targets: Dict[Tuple[str, str], str],
+                  min_blocker_age: float = 0.0) -> List[Dict[str, Any]]:
+    """Sessions holding or queued for locks that conflict with the targets
+
+    Schema-wide targets are only an estimate, so for those just granted locks
+    held by transactions open for at least ``min_blocker_age`` seconds count;
+    shorter ones are left to lock_timeout. Autovacuum and other background
+    workers never count, they yield to DDL on their own.
+    """
+    if not targets:
+        return []
+    schemas = sorted({schema for schema, _ in targets})
+    blockers = []
+    for row in connection.execute(text(_BLOCKERS_SQL), {'schemas': schemas}):
+        needed = targets.get((row.nspname, row.relname))
+        if needed is None:
+            needed = targets.get((row.nspname, '*'))
+            if needed is None or not row.granted or row.xact_age is None or row.xact_age < min_blocker_age:
+                continue
+        if row.mode not in LOCK_CONFLICTS[needed]:
+            continue
+        blockers.append({
+            'pid': row.pid,
+            'relation': f"{row.nspname}.{row.relname}",
+            'mode': row.mode,
+            'granted': row.granted,
+            'state': row.state,
+            'user': row.usename,
+            'xact_age': round(float(row.xact_age), 3) if row.xact_age is not None else None,
+            'query': row.query
+        })
+    return blockers
+
+
+class LockGuard:
+    """Waits for, aborts on, or times out lock contention before each revision"""
+
+    def __init__(
+        self,
+        strategy: str = 'wait',
+        max_wait: float = 30.0,
+        poll_interval: float = 1.0,
+        lock_timeout: Union[str, int] = '5s',
+        max_attempts: int = 3,
+        time_remaining_ms: Optional[Callable[[], int]] = None,
+        safety_margin: float = 10.0,
+        min_blocker_age: float = 5.0
+    ):
+        if strategy not in LOCK_STRATEGIES:
+            raise ValueError(f"Unknown lock strategy: {strategy}. Valid strategies are: {', '.join(LOCK_STRATEGIES)}")
+        # A bare number from a JSON event means milliseconds, as in PostgreSQL
+        if isinstance(lock_timeout, int) and not isinstance(lock_timeout, bool):
+            lock_timeout = f"{lock_timeout}ms"
+        # Interpolated into SET lock_timeout, so only accept plain durations
+        if not isinstance(lock_timeout, str) or not re.fullmatch(r'\d+\s*(ms|s|min)?', lock_timeout):
+            raise ValueError(f"Invalid lock_timeout: {lock_timeout}")
+        self.strategy = strategy
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.max_attempts = max_attempts
+        self.time_remaining_ms = time_remaining_ms
+        self.safety_margin = safety_margin
+        self.min_blocker_age = min_blocker_age
+        self.wait_seconds = 0.0
+        self.lock_timeouts = 0
+        self.revisions: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_lambda_context(cls, context: Any, **kwargs: Any) -> "LockGuard":
+        """Build a guard that never waits past the invocation's remaining time"""
+        time_remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+        return cls(time_remaining_ms=time_remaining_ms, **kwargs)
+
+    def report(self) -> Dict[str, Any]:
+        """Contention summary for the response body"""
+        return {
+            'strategy': self.strategy,
+            'wait_seconds': round(self.wait_seconds, 3),
+            'lock_timeouts': self.lock_timeouts,
+            'revisions': self.revisions
+        }
+
+    def _wait_budget(self) -> float:
+        """Seconds we may still spend waiting for a safe window"""
+        if self.time_remaining_ms is None:
+            return self.max_wait
+        return min(self.max_wait, self.time_remaining_ms() / 1000.0 - self.safety_margin)
+
+    def _wait_for_window(self, engine: Engine, rev_id: str, targets: Dict[Tuple[str, str], str],
+                         entry: Dict[str, Any]) -> None:
+        """Block until no session conflicts with the targets, per the strategy"""
+        if not targets or self.strategy == 'proceed':
+            return
+        started = time.monotonic()
+        try:
+            while True:
+                with engine.connect() as connection:
+                    blockers = find_blockers(connection, targets, self.min_blocker_age)
+                if not blockers:
+                    return
+                entry['blockers'] = blockers
+                relations = sorted({blocker['relation'] for blocker in blockers})
+                if self.strategy == 'abort':
+                    raise LockContentionError(
+                        f"Revision {rev_id} would block on {', '.join(relations)} "
+                        f"held by pid(s) {sorted({blocker['pid'] for blocker in blockers})}"
+                    )
+                if time.monotonic() - started + self.poll_interval > self._wait_budget():
+                    raise LockContentionError(
+                        f"No safe window for revision {rev_id} after {time.monotonic() - started:.1f}s, "
+                        f"still blocked on {', '.join(relations)}"
+                    )
+                logger.info(f"⏳ Revision {rev_id} waiting on {len(blockers)} conflicting lock(s): {relations}")
+                time.sleep(self.poll_interval)
+        finally:
+            waited = time.monotonic() - started
+            entry['wait_seconds'] = round(entry['wait_seconds'] + waited, 3)
+            self.wait_seconds += waited
+
+    def run(self, engine: Engine, rev_id: str, sql: str, operation: Callable[[], T]) -> T:
+        """Apply a revision once its locks look available, retrying lock timeouts"""
+        targets = estimate_locks(sql)
+        entry = self.revisions.setdefault(rev_id, {
+            'relations': {f"{schema}.{relation}": mode for (schema, relation), mode in targets.items()},
+            'wait_seconds': 0.0,
+            'lock_timeouts': 0,
+            'blockers': []
+        })
+        attempt = 1
+        while True:
+            self._wait_for_window(engine, rev_id, targets, entry)
+            started = time.monotonic()
+            try:
+                return operation()
+            except Exception as e:
+                if error_sqlstate(e) != LOCK_NOT_AVAILABLE:
+                    raise
+                # Time lost queueing until lock_timeout fired counts as contention
+                waited = time.monotonic() - started
+                entry['wait_seconds'] = round(entry['wait_seconds'] + waited, 3)
+                self.wait_seconds += waited
+                entry['lock_timeouts'] += 1
+                self.lock_timeouts += 1
+                if attempt >= self.max_attempts:
+                    raise LockContentionError(
+                        f"Revision {rev_id} hit lock_timeout ({self.lock_timeout}) {attempt} time(s)"
+                    ) from None
+                logger.warning(f"🔒 Revision {rev_id} hit lock_timeout (attempt {attempt}/{self.max_attempts}), retrying")
+                if self.strategy == 'proceed':
+                    # No pre-flight wait to act as backoff
+                    time.sleep(self.poll_interval)
+                attempt += 1
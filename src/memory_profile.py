@@ -0,0 +1,90 @@
+"""
+Memory instrumentation for the Lambda package
+tracemalloc checkpoints around the expensive phases of an invocation, and
+helpers to hand memory back once a run is over
+"""
+import gc
+import ctypes
+import logging
+import linecache
+import importlib
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size, read from /proc on Linux"""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        import resource
+        return round(resident_pages * resource.getpagesize() / _MB, 2)
+    except (OSError, ValueError, IndexError, ImportError):
+        return None
+
+
+class MemoryProfiler:
+    """Records traced/peak/RSS memory and the top allocation growth per phase"""
+
+    def __init__(self, top_n: int = 5):
+        self.top_n = top_n
+        self.checkpoints: List[Dict[str, Any]] = []
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        # Tracing may already be on since import time (MEMORY_PROFILE_IMPORTS)
+        self._started_here = not tracemalloc.is_tracing()
+        if self._started_here:
+            tracemalloc.start()
+
+    def checkpoint(self, label: str) -> Dict[str, Any]:
+        """Snapshot memory now and diff it against the previous checkpoint"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        entry: Dict[str, Any] = {
+            'label': label,
+            'traced_mb': round(current / _MB, 2),
+            'peak_mb': round(peak / _MB, 2),
+            'rss_mb': _rss_mb()
+        }
+        if self._previous is not None:
+            entry['top_growth'] = [
+                {
+                    'file': stat.traceback[0].filename,
+                    'size_diff_kb': round(stat.size_diff / 1024, 1)
+                }
+                for stat in snapshot.compare_to(self._previous, 'filename')[:self.top_n]
+            ]
+        self._previous = snapshot
+        self.checkpoints.append(entry)
+        logger.info(f"🧠 {label}: traced={entry['traced_mb']}MB peak={entry['peak_mb']}MB rss={entry['rss_mb']}MB")
+        return entry
+
+    def report(self) -> Dict[str, Any]:
+        """Checkpoints and overall peak, for the response body"""
+        _, peak = tracemalloc.get_traced_memory()
+        return {'checkpoints': self.checkpoints, 'peak_mb': round(peak / _MB, 2)}
+
+    def stop(self) -> None:
+        """Stop tracing unless it was already running before this profiler"""
+        self._previous = None
+        if self._started_here:
+            tracemalloc.stop()
+
+
+def release_process_memory() -> None:
+    """Drop interpreter caches and return freed heap pages to the OS"""
+    # Source lines of revision files cached by tracebacks/warnings
+    linecache.clearcache()
+    importlib.invalidate_caches()
+    gc.collect()
+    try:
+        # glibc keeps freed arenas mapped; trim them so RSS actually drops
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
@@ -0,0 +1,185 @@
+"""
+Retry policy for transient database failures
+Classifies errors by SQLSTATE and retries with jittered backoff within the
+time left in the Lambda invocation
+"""
+import time
+import random
+import logging
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# Failover, lock and resource errors worth retrying
+TRANSIENT_SQLSTATES = {
+    '40001',  # serialization_failure
+    '40P01',  # deadlock_detected
+    '55P03',  # lock_not_available (lock_timeout)
+    '57014',  # query_canceled (statement_timeout)
+    '57P01',  # admin_shutdown
+    '57P02',  # crash_shutdown
+    '57P03',  # cannot_connect_now
+    '53300',  # too_many_connections
+    '53400',  # configuration_limit_exceeded
+}
+# Whole SQLSTATE classes that are transient: 08 = connection exception
+TRANSIENT_SQLSTATE_CLASSES = {'08'}
+
+# Driver errors raised while connecting carry no SQLSTATE, so libpq's message is
+# all there is. Authentication and configuration problems never fix themselves.
+FATAL_MESSAGES = (
+    'password authentication failed',
+    'authentication failed',
+    'no pg_hba.conf entry',
+    'does not exist',
+    'could not translate host name',
+    'invalid dsn',
+    'invalid connection option',
+)
+TRANSIENT_MESSAGES = (
+    'could not connect to server',
+    'connection refused',
+    'server closed the connection',
+    'connection reset',
+    'connection timed out',
+    'timeout expired',
+    'terminating connection',
+    'ssl syscall error',
+    'ssl connection has been closed',
+    'could not receive data from server',
+    'could not send data to server',
+    'connection already closed',
+    'the database system is starting up',
+    'the database system is shutting down',
+    'the database system is in recovery mode',
+)
+
+
+def _sqlstate(error: BaseException) -> Optional[str]:
+    """SQLSTATE of a DBAPI error (psycopg2 ``pgcode`` or psycopg ``sqlstate``)"""
+    return getattr(error, 'pgcode', None) or getattr(error, 'sqlstate', None)
+
+
+def _next_error(error: BaseException) -> Optional[BaseException]:
+    """The error that led to this one; ``raise ... from None`` ends the chain"""
+    if error.__cause__ is not None:
+        return error.__cause__
+    return None if error.__suppress_context__ else error.__context__
+
+
+def error_sqlstate(error: BaseException) -> Optional[str]:
+    """First SQLSTATE found on an exception or the errors that caused it"""
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        sqlstate = _sqlstate(current)
+        if sqlstate:
+            return sqlstate
+        if isinstance(current, DBAPIError) and current.orig is not None:
+            current = current.orig
+        else:
+            current = _next_error(current)
+    return None
+
+
+def _classify_message(message: str) -> str:
+    """Classify a driver error without SQLSTATE by its libpq message"""
+    message = message.lower()
+    if any(marker in message for marker in FATAL_MESSAGES):
+        return FATAL
+    if any(marker in message for marker in TRANSIENT_MESSAGES):
+        return TRANSIENT
+    return FATAL
+
+
+def classify_error(error: BaseException) -> str:
+    """Classify an exception (and its causes) as transient or fatal"""
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        sqlstate = _sqlstate(current)
+        if sqlstate:
+            if sqlstate in TRANSIENT_SQLSTATES or sqlstate[:2] in TRANSIENT_SQLSTATE_CLASSES:
+                return TRANSIENT
+            return FATAL
+        if isinstance(current, DBAPIError):
+            if current.connection_invalidated:
+                return TRANSIENT
+            orig = current.orig
+            if orig is not None and _sqlstate(orig) is None and isinstance(current, (OperationalError, InterfaceError)):
+                # Driver-level failures (refused, reset, bad password) carry no SQLSTATE
+                return _classify_message(str(orig))
+            current = orig
+            continue
+        if isinstance(current, (DisconnectionError, ConnectionError, TimeoutError)):
+            return TRANSIENT
+        current = _next_error(current)
+    return FATAL
+
+
+class RetryPolicy:
+    """Retry transient failures with full-jitter exponential backoff"""
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        time_remaining_ms: Optional[Callable[[], int]] = None,
+        safety_margin: float = 10.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.time_remaining_ms = time_remaining_ms
+        self.safety_margin = safety_margin
+        self.retries: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_lambda_context(cls, context: Any, **kwargs: Any) -> "RetryPolicy":
+        """Build a policy bounded by the invocation's remaining time"""
+        time_remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+        return cls(time_remaining_ms=time_remaining_ms, **kwargs)
+
+    def _backoff(self, attempt: int) -> float:
+        """Delay before the given retry attempt (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _has_time_for(self, delay: float) -> bool:
+        """Check that sleeping still leaves the safety margin in the invocation"""
+        if self.time_remaining_ms is None:
+            return True
+        return self.time_remaining_ms() / 1000.0 - delay > self.safety_margin
+
+    def call(self, operation: Callable[[], T], description: str) -> T:
+        """Run an operation, retrying transient failures"""
+        attempt = 1
+        while True:
+            try:
+                return operation()
+            except Exception as e:
+                kind = classify_error(e)
+                delay = self._backoff(attempt)
+                if kind == FATAL or attempt >= self.max_attempts or not self._has_time_for(delay):
+                    logger.error(f"❌ {description} failed ({kind}, attempt {attempt}): {e}")
+                    raise
+                logger.warning(
+                    f"🔁 {description} failed with a transient error (attempt {attempt}/"
+                    f"{self.max_attempts}), retrying in {delay:.2f}s: {e}"
+                )
+                self.retries.append({
+                    'operation': description,
+                    'attempt': attempt,
+                    'error': str(e),
+                    'delay': round(delay, 3)
+                })
+                time.sleep(delay)
+                attempt += 1
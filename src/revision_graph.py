@@ -0,0 +1,70 @@
+"""
+Revision graph helpers for non-linear migration histories
+Builds the dependency DAG of pending revisions and groups them into waves
+that can be applied independently of each other
+"""
+import logging
+from typing import Dict, List, Optional, Set, Tuple, Union
+from alembic.script import ScriptDirectory
+
+logger = logging.getLogger(__name__)
+
+# Module-level flag a revision sets to opt into concurrent application
+PARALLEL_SAFE_FLAG = "parallel_safe"
+
+
+def _as_tuple(value: Optional[Union[str, Tuple[str, ...], List[str]]]) -> Tuple[str, ...]:
+    """Normalize an Alembic down_revision/depends_on value to a tuple"""
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(value)
+
+
+def build_revision_graph(script: ScriptDirectory, revision_ids: List[str]) -> Dict[str, Set[str]]:
+    """Map each pending revision to the pending revisions it must wait for
+
+    Edges come from both ``down_revision`` and ``depends_on``; dependencies on
+    revisions that are already applied (not pending) are dropped.
+    """
+    pending = set(revision_ids)
+    graph: Dict[str, Set[str]] = {}
+    for rev_id in revision_ids:
+        rev = script.get_revision(rev_id)
+        parents = _as_tuple(rev.down_revision) + _as_tuple(rev.dependencies)
+        resolved = set()
+        for parent in parents:
+            # depends_on may name a branch label, resolve it to a revision id
+            parent_rev = script.get_revision(parent)
+            if parent_rev is not None and parent_rev.revision in pending:
+                resolved.add(parent_rev.revision)
+        graph[rev_id] = resolved
+    return graph
+
+
+def plan_waves(graph: Dict[str, Set[str]]) -> List[List[str]]:
+    """Group revisions into waves; revisions in one wave share no dependency"""
+    remaining = {rev_id: set(parents) for rev_id, parents in graph.items()}
+    waves: List[List[str]] = []
+    while remaining:
+        ready = sorted(rev_id for rev_id, parents in remaining.items() if not parents)
+        if not ready:
+            raise ValueError(f"Cycle detected in revision graph: {sorted(remaining)}")
+        waves.append(ready)
+        for rev_id in ready:
+            del remaining[rev_id]
+        for parents in remaining.values():
+            parents.difference_update(ready)
+    return waves
+
+
+def is_parallel_safe(script: ScriptDirectory, rev_id: str) -> bool:
+    """Check whether a revision module opted into parallel application"""
+    rev = script.get_revision(rev_id)
+    return bool(getattr(rev.module, PARALLEL_SAFE_FLAG, False))
+
+
+def is_merge_point(script: ScriptDirectory, rev_id: str) -> bool:
+    """Check whether a revision merges several branches"""
+    return len(_as_tuple(script.get_revision(rev_id).down_revision)) > 1
@@ -3,23 +3,57 @@ Simple migration runner for database day-2 operations
 Just runs existing migrations - no creation, no complex features
 """
 import os
+import time
 import logging
-from typing import Optional, Dict, Any
+import multiprocessing
+from typing import Optional, Callable, Dict, Any, Iterator, List, Tuple, TypeVar
 from alembic import command
 from alembic.config import Config
+from alembic.operations import Operations
 from alembic.runtime.migration import MigrationContext
 from alembic.script import ScriptDirectory
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+from src.access_spec import load_access_spec, fetch_catalog_state, plan_access_statements, apply_access_plan
+from src.lock_guard import LockGuard, render_revision_sql
+from src.memory_profile import MemoryProfiler, release_process_memory
+from src.retry_policy import RetryPolicy
+from src.revision_graph import build_revision_graph, plan_waves, is_parallel_safe, is_merge_point, _as_tuple
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Alembic's default version table, as configured by alembic/env.py
+VERSION_TABLE = "alembic_version"
+
+
+def _is_bookkeeping(statement: str, parameters: Any) -> bool:
+    """Statements a run issues around a revision rather than for it
+    
+    Alembic's reads and writes of the version table (including the has_table
+    lookup, which passes the name as a parameter) and the lock guard's
+    lock_timeout.
+    """
+    if VERSION_TABLE in statement or VERSION_TABLE in str(parameters):
+        return True
+    return statement.startswith("SET LOCAL lock_timeout")
+
 
 class SimpleMigrationRunner:
     """Simple migration runner - just applies existing migrations"""
     
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, max_parallel: int = 4,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 profiler: Optional[MemoryProfiler] = None,
+                 lock_guard: Optional[LockGuard] = None):
         self.database_url = database_url
-        self.engine = create_engine(database_url)
+        self.max_parallel = max_parallel
+        self.retry_policy = retry_policy
+        self.profiler = profiler
+        self.lock_guard = lock_guard
+        # Pre-ping so pooled connections killed by a failover are replaced
+        self.engine = create_engine(database_url, pool_pre_ping=True)
         self.alembic_cfg = self._create_config()
     
     def _create_config(self) -> Config:
@@ -40,50 +74,133 @@ class SimpleMigrationRunner:
         """Check if database connection works"""
         try:
             logger.info(f"Testing database connection to: {self.database_url}")
-            with self.engine.connect() as connection:
-                result = connection.execute(text("SELECT 1"))
-                result.fetchone()
+            self._with_retry(self._ping, "Database connection")
             logger.info("Database connection successful")
             return {'success': True, 'message': 'Database connection successful'}
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             return {'success': False, 'error': str(e)}
     
+    def memory_checkpoint(self, label: str) -> None:
+        """Record a memory checkpoint when profiling is enabled"""
+        if self.profiler is not None:
+            self.profiler.checkpoint(label)
+    
+    def release_resources(self) -> None:
+        """Free what a finished run holds: pooled connections and interpreter caches"""
+        self.engine.dispose()
+        self.alembic_cfg.attributes.pop("connection", None)
+        release_process_memory()
+    
+    def _ping(self) -> None:
+        """Run a trivial query on a fresh connection"""
+        with self.engine.connect() as connection:
+            result = connection.execute(text("SELECT 1"))
+            result.fetchone()
+    
+    def _with_retry(self, operation: Callable[[], T], description: str) -> T:
+        """Run an operation through the retry policy, if one is configured"""
+        if self.retry_policy is None:
+            return operation()
+        return self.retry_policy.call(operation, description)
+    
+    def _retry_report(self) -> Dict[str, Any]:
+        """Retry and lock contention details to merge into a result"""
+        report: Dict[str, Any] = {}
+        if self.retry_policy is not None:
+            report['retries'] = list(self.retry_policy.retries)
+        if self.lock_guard is not None:
+            report['lock_contention'] = self.lock_guard.report()
+        return report
+    
+    def _upgrade_revisions(self, revision_ids: List[str]) -> List[str]:
+        """Upgrade one revision at a time, each committed and retried on its own
+        
+        ``alembic upgrade <rev>`` starts from whatever is stamped, so a retry
+        after a transient failure resumes at the revision that failed.
+        """
+        script = ScriptDirectory.from_config(self.alembic_cfg)
+        applied: List[str] = []
+        for rev_id in revision_ids:
+            self._with_retry(
+                lambda: self._apply_revision(script, rev_id),
+                f"Upgrade to {rev_id}"
+            )
+            applied.append(rev_id)
+        return applied
+    
+    def _apply_revision(self, script: ScriptDirectory, rev_id: str) -> None:
+        """Upgrade to one revision, behind the lock guard when configured"""
+        if self.lock_guard is None:
+            command.upgrade(self.alembic_cfg, rev_id)
+            return
+        
+        sql = render_revision_sql(script, rev_id)
+        # env.py applies it as SET LOCAL lock_timeout inside the migration transaction
+        self.alembic_cfg.attributes["lock_timeout"] = self.lock_guard.lock_timeout
+        try:
+            self.lock_guard.run(
+                self.engine, rev_id, sql,
+                lambda: command.upgrade(self.alembic_cfg, rev_id)
+            )
+        finally:
+            self.alembic_cfg.attributes.pop("lock_timeout", None)
+    
+    def _plan_migration(self, target_revision: str) -> Dict[str, Any]:
+        """Resolve the target and the pending revisions in chronological order"""
+        # Get current revision before migration
+        current_heads = self._get_current_heads()
+        current_rev = ",".join(sorted(current_heads)) if current_heads else None
+        logger.info(f"Current database revision: {current_rev or 'None (empty database)'}")
+        
+        # Get the actual migration path that will be taken
+        script = ScriptDirectory.from_config(self.alembic_cfg)
+        
+        # Determine the actual target revision (resolve "head" to actual revision)
+        heads = script.get_heads()
+        if target_revision in ("head", "heads") and len(heads) > 1:
+            # Independent branches - upgrade every branch head
+            actual_target: Any = tuple(heads)
+            upgrade_target = "heads"
+        elif target_revision == "head":
+            actual_target = script.get_current_head()
+            upgrade_target = target_revision
+        else:
+            actual_target = target_revision
+            upgrade_target = target_revision
+        
+        # Get the migration path from current to target
+        migration_path = []
+        try:
+            # Everything below the target that is not below a current head
+            already_applied = set()
+            if current_heads:
+                for rev in script.iterate_revisions(current_heads, None):
+                    already_applied.add(rev.revision)
+            for rev in script.iterate_revisions(actual_target, None):
+                if rev.revision not in already_applied:
+                    migration_path.append(rev.revision)
+            migration_path.reverse()  # We want chronological order
+        except Exception as e:
+            logger.warning(f"Could not determine migration path: {e}")
+            migration_path = [actual_target] if actual_target != current_rev else []
+        
+        return {
+            'script': script,
+            'current_revision': current_rev,
+            'migration_path': migration_path,
+            'upgrade_target': upgrade_target
+        }
+    
     def run_migrations(self, target_revision: str = "head") -> Dict[str, Any]:
         """Run migrations with detailed logging"""
         try:
             logger.info(f"Starting migration run to target: {target_revision}")
             
-            # Get current revision before migration
-            current_rev = self._get_current_revision()
-            logger.info(f"Current database revision: {current_rev or 'None (empty database)'}")
-            
-            # Get the actual migration path that will be taken
-            script = ScriptDirectory.from_config(self.alembic_cfg)
-            
-            # Determine the actual target revision (resolve "head" to actual revision)
-            if target_revision == "head":
-                head_rev = script.get_current_head()
-                actual_target = head_rev
-            else:
-                actual_target = target_revision
-            
-            # Get the migration path from current to target
-            migration_path = []
-            try:
-                if current_rev is None:
-                    # Starting from scratch - get path from base to target
-                    for rev in script.iterate_revisions(actual_target, None):
-                        migration_path.append(rev.revision)
-                    migration_path.reverse()  # We want chronological order
-                else:
-                    # Get path from current to target
-                    for rev in script.iterate_revisions(actual_target, current_rev):
-                        migration_path.append(rev.revision)
-                    migration_path.reverse()  # We want chronological order
-            except Exception as e:
-                logger.warning(f"Could not determine migration path: {e}")
-                migration_path = [actual_target] if actual_target != current_rev else []
+            plan = self._plan_migration(target_revision)
+            script = plan['script']
+            current_rev = plan['current_revision']
+            migration_path = plan['migration_path']
             
             if not migration_path:
                 logger.info("🎉 No pending migrations - database is up to date!")
@@ -99,8 +216,27 @@ class SimpleMigrationRunner:
             logger.info(f"🚀 Running alembic upgrade to '{target_revision}'...")
             logger.info(f"📋 Migration path: {' -> '.join([current_rev or 'None'] + migration_path)}")
             
-            # Run the migration
-            command.upgrade(self.alembic_cfg, target_revision)
+            self.memory_checkpoint("before_upgrade")
+            waves = plan_waves(build_revision_graph(script, migration_path))
+            if any(len(self._parallel_group(script, wave)) > 1 for wave in waves):
+                # Non-linear graph with independent parallel-safe revisions
+                parallel_result = self._run_waves(script, waves)
+                if not parallel_result['success']:
+                    parallel_result.update({
+                        'target_revision': target_revision,
+                        'previous_revision': current_rev,
+                        'final_revision': self._last_known_revision(),
+                        **self._retry_report()
+                    })
+                    return parallel_result
+                migration_path = parallel_result['applied_migrations']
+            elif self.retry_policy is not None or self.lock_guard is not None:
+                # Commit revision by revision so retries resume from the last stamp
+                self._upgrade_revisions(migration_path)
+            else:
+                # Run the migration
+                command.upgrade(self.alembic_cfg, plan['upgrade_target'])
+            self.memory_checkpoint("after_upgrade")
             
             # Get final revision after migration
             final_rev = self._get_current_revision()
@@ -112,30 +248,344 @@ class SimpleMigrationRunner:
                 'applied_migrations': migration_path,
                 'final_revision': final_rev,
                 'target_revision': target_revision,
-                'previous_revision': current_rev
+                'previous_revision': current_rev,
+                **self._retry_report()
             }
             
         except Exception as e:
             logger.error(f"❌ Migration failed: {e}")
+            result = {'success': False, 'error': str(e)}
+            if self.retry_policy is not None or self.lock_guard is not None:
+                # Revisions were committed one by one - report where the run stopped
+                result.update({'final_revision': self._last_known_revision(), **self._retry_report()})
+            return result
+    
+    def stream_migrations(self, target_revision: str = "head") -> Iterator[Dict[str, Any]]:
+        """Run migrations one revision at a time, yielding progress events
+        
+        Each revision is applied and committed on its own, through the retry
+        policy and lock guard when configured, so a consumer that stops
+        iterating leaves the database stamped at the last finished revision.
+        The final event is always ``run_finished`` carrying the same result
+        dict as :meth:`run_migrations`.
+        """
+        started = time.monotonic()
+        
+        def _event(name: str, **fields: Any) -> Dict[str, Any]:
+            return {'event': name, 'elapsed': round(time.monotonic() - started, 3), **fields}
+        
+        applied: List[str] = []
+        current_rev: Optional[str] = None
+        try:
+            logger.info(f"Starting streamed migration run to target: {target_revision}")
+            plan = self._plan_migration(target_revision)
+            script = plan['script']
+            current_rev = plan['current_revision']
+            migration_path = plan['migration_path']
+            yield _event('run_started', target_revision=target_revision,
+                         previous_revision=current_rev, pending_migrations=migration_path)
+            
+            statement_count = [0]
+            
+            def _count_statement(conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+                if not _is_bookkeeping(statement, parameters):
+                    statement_count[0] += 1
+            
+            self.memory_checkpoint("before_upgrade")
+            for index, rev_id in enumerate(migration_path, start=1):
+                yield _event('revision_started', revision=rev_id,
+                             index=index, total=len(migration_path))
+                revision_started = time.monotonic()
+                self._with_retry(
+                    lambda: self._stream_revision(script, rev_id, _count_statement, statement_count),
+                    f"Upgrade to {rev_id}"
+                )
+                applied.append(rev_id)
+                yield _event('revision_finished', revision=rev_id,
+                             index=index, total=len(migration_path),
+                             statement_count=statement_count[0],
+                             duration=round(time.monotonic() - revision_started, 3))
+            self.memory_checkpoint("after_upgrade")
+            
+            final_rev = self._get_current_revision()
+            if applied:
+                message = f"Successfully migrated from {current_rev or 'None'} to {final_rev}"
+            else:
+                message = 'No pending migrations - database is up to date'
+            result = {
+                'success': True,
+                'message': message,
+                'applied_migrations': applied,
+                'final_revision': final_rev,
+                'target_revision': target_revision,
+                'previous_revision': current_rev,
+                **self._retry_report()
+            }
+        except Exception as e:
+            logger.error(f"❌ Migration failed: {e}")
+            result = {'success': False, 'error': str(e), 'applied_migrations': applied}
+            if self.retry_policy is not None or self.lock_guard is not None:
+                result.update({'final_revision': self._last_known_revision(), **self._retry_report()})
+        
+        yield _event('run_finished', result=result)
+    
+    def _stream_revision(self, script: ScriptDirectory, rev_id: str,
+                         counter: Callable[..., None], statement_count: List[int]) -> None:
+        """Apply one revision on its own connection, counting its statements
+        
+        Every attempt gets a fresh connection, so a retry after a dropped
+        connection does not reuse the invalidated one.
+        """
+        statement_count[0] = 0
+        with self.engine.connect() as connection:
+            event.listen(connection, "before_cursor_execute", counter)
+            # env.py runs on this connection instead of opening its own
+            self.alembic_cfg.attributes["connection"] = connection
+            try:
+                self._apply_revision(script, rev_id)
+                if connection.in_transaction():
+                    connection.commit()
+            finally:
+                self.alembic_cfg.attributes.pop("connection", None)
+    
+    def reconcile_access(self, spec_path: str, dry_run: bool = False) -> Dict[str, Any]:
+        """Converge roles, schemas and grants on a declarative access spec"""
+        try:
+            logger.info(f"Reconciling access against spec: {spec_path}")
+            spec = load_access_spec(spec_path)
+            with self.engine.begin() as connection:
+                state = fetch_catalog_state(connection)
+                plan = plan_access_statements(spec, state, dry_run=dry_run)
+                statements = plan['statements']
+                for statement in statements:
+                    logger.info(f"📋 {statement}")
+                if plan['secret_statements']:
+                    logger.info(f"📋 {len(plan['secret_statements'])} password statement(s) (redacted)")
+                if not dry_run:
+                    apply_access_plan(connection, plan)
+            
+            pending = len(statements) + len(plan['secret_statements'])
+            if not pending:
+                message = 'Access is up to date with the spec'
+            elif dry_run:
+                message = f"Dry run: {pending} statement(s) needed to reconcile access"
+            else:
+                message = f"Applied {pending} statement(s) to reconcile access"
+            logger.info(f"✅ {message}")
+            return {
+                'success': True,
+                'message': message,
+                'statements': statements,
+                'password_statements': len(plan['secret_statements']),
+                'dry_run': dry_run
+            }
+        except Exception as e:
+            logger.error(f"❌ Access reconcile failed: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _get_current_revision(self) -> Optional[str]:
-        """Get the current database revision"""
+    def _parallel_group(self, script: ScriptDirectory, wave: List[str]) -> List[str]:
+        """Revisions of a wave that may run concurrently (merge points never do)"""
+        return [
+            rev_id for rev_id in wave
+            if is_parallel_safe(script, rev_id) and not is_merge_point(script, rev_id)
+        ]
+    
+    def _run_waves(self, script: ScriptDirectory, waves: List[List[str]]) -> Dict[str, Any]:
+        """Apply revision waves, running parallel-safe revisions on separate connections"""
+        applied: List[str] = []
+        for index, wave in enumerate(waves, start=1):
+            parallel = self._parallel_group(script, wave)
+            serial = [rev_id for rev_id in wave if rev_id not in parallel]
+            logger.info(f"🌊 Wave {index}/{len(waves)}: parallel={parallel} serial={serial}")
+            
+            if len(parallel) > 1:
+                # Workers stamp their own revision, the table must exist first
+                self._with_retry(self._ensure_version_table, "Version table check")
+                succeeded, failures = self._apply_parallel(script, parallel)
+                applied.extend(succeeded)
+                if failures:
+                    logger.error(f"❌ Parallel revisions failed: {failures}")
+                    return {
+                        'success': False,
+                        'error': f"Revisions failed: {', '.join(sorted(failures))}",
+                        'failed_migrations': failures,
+                        'applied_migrations': applied
+                    }
+            else:
+                serial = wave
+            
+            applied.extend(self._upgrade_revisions(serial))
+        
+        return {'success': True, 'applied_migrations': applied}
+    
+    def _apply_parallel(self, script: ScriptDirectory, revision_ids: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        """Apply independent revisions concurrently, one process and connection each"""
+        # Alembic's `op` proxy is module-global, so each revision gets its own process
+        mp_context = multiprocessing.get_context("fork")
+        succeeded: List[str] = []
+        failures: Dict[str, str] = {}
+        
+        for start in range(0, len(revision_ids), self.max_parallel):
+            batch = revision_ids[start:start + self.max_parallel]
+            workers = []
+            for rev_id in batch:
+                parent_conn, child_conn = mp_context.Pipe(duplex=False)
+                process = mp_context.Process(
+                    target=self._apply_revision_worker,
+                    args=(script, rev_id, child_conn)
+                )
+                process.start()
+                child_conn.close()
+                workers.append((rev_id, process, parent_conn))
+            
+            for rev_id, process, parent_conn in workers:
+                try:
+                    outcome = parent_conn.recv()
+                except EOFError:
+                    outcome = {'success': False, 'error': 'worker exited without a result'}
+                process.join()
+                if self.retry_policy is not None:
+                    self.retry_policy.retries.extend(outcome.get('retries', []))
+                if outcome['success']:
+                    logger.info(f"✅ Revision {rev_id} applied in {outcome['elapsed']:.2f}s")
+                    succeeded.append(rev_id)
+                else:
+                    failures[rev_id] = outcome['error']
+        
+        return succeeded, failures
+    
+    def _apply_revision_worker(self, script: ScriptDirectory, rev_id: str, result_conn: Any) -> None:
+        """Run one revision's upgrade() in a forked worker on its own connection
+        
+        The worker applies the same lock_timeout and retry policy as a serial
+        run and stamps the revision in the transaction that applies it, so a
+        committed revision is never left unstamped.
+        """
+        # Never touch connections inherited from the parent's pool
+        self.engine.dispose(close=False)
+        engine = create_engine(self.database_url, poolclass=NullPool)
+        if self.retry_policy is not None:
+            # Forked copy of the policy - only report this worker's retries
+            self.retry_policy.retries = []
+        started = time.monotonic()
+        
+        def _upgrade() -> None:
+            revision = script.get_revision(rev_id)
+            with engine.begin() as connection:
+                if self.lock_guard is not None:
+                    connection.exec_driver_sql(f"SET LOCAL lock_timeout = '{self.lock_guard.lock_timeout}'")
+                context = MigrationContext.configure(connection)
+                if self._is_applied(script, context, rev_id):
+                    # An earlier attempt committed but lost the connection before the reply
+                    logger.info(f"Revision {rev_id} is already applied, skipping")
+                    return
+                with Operations.context(context):
+                    revision.module.upgrade()
+                self._stamp_revision(context, rev_id, _as_tuple(revision.down_revision))
+        
         try:
+            self._with_retry(_upgrade, f"Upgrade to {rev_id}")
+            outcome: Dict[str, Any] = {'success': True, 'elapsed': time.monotonic() - started}
+        except Exception as e:
+            outcome = {'success': False, 'error': str(e)}
+        finally:
+            engine.dispose()
+        if self.retry_policy is not None:
+            outcome['retries'] = self.retry_policy.retries
+        result_conn.send(outcome)
+        result_conn.close()
+    
+    def _ensure_version_table(self) -> None:
+        """Create the Alembic version table if it does not exist yet"""
+        with self.engine.begin() as connection:
+            version = MigrationContext.configure(connection)._version
+            version.create(connection, checkfirst=True)
+    
+    @staticmethod
+    def _is_applied(script: ScriptDirectory, context: MigrationContext, rev_id: str) -> bool:
+        """Check whether a revision is stamped or below a stamped head"""
+        heads = context.get_current_heads()
+        if not heads:
+            return False
+        return any(rev.revision == rev_id for rev in script.iterate_revisions(heads, None))
+    
+    @staticmethod
+    def _stamp_revision(context: MigrationContext, rev_id: str, down_revisions: Tuple[str, ...]) -> None:
+        """Record a revision in the version table, inside the context's transaction
+        
+        Siblings of a wave share their parent's row: the first to commit moves
+        it, the others then find it gone and insert a row of their own, like
+        Alembic does for a new branch.
+        """
+        connection = context.connection
+        assert connection is not None
+        version = context._version
+        updated = 0
+        if down_revisions:
+            updated = connection.execute(
+                version.update()
+                .where(version.c.version_num.in_(down_revisions))
+                .values(version_num=rev_id)
+            ).rowcount
+        if not updated:
+            connection.execute(version.insert().values(version_num=rev_id))
+    
+    def _get_current_heads(self) -> Tuple[str, ...]:
+        """Get every revision currently stamped in the database"""
+        def _read_heads() -> Tuple[str, ...]:
             with self.engine.connect() as connection:
                 context = MigrationContext.configure(connection)
-                return context.get_current_revision()
+                return tuple(context.get_current_heads())
+        
+        try:
+            return self._with_retry(_read_heads, "Current revision lookup")
+        except Exception as e:
+            if self.retry_policy is not None:
+                # Planning from base after a failed lookup would re-apply everything
+                raise
+            logger.warning(f"Could not get current heads: {e}")
+            return ()
+    
+    def _get_current_revision(self) -> Optional[str]:
+        """Get the current database revision (comma-joined when branched)"""
+        heads = self._get_current_heads()
+        return ",".join(sorted(heads)) if heads else None
+    
+    def _last_known_revision(self) -> Optional[str]:
+        """Current revision for a failure report, None if it cannot be read"""
+        try:
+            return self._get_current_revision()
         except Exception as e:
             logger.warning(f"Could not get current revision: {e}")
             return None
 
 
-def apply_day2_operations(database_url: str, target_revision: str = "head") -> Dict[str, Any]:
+def apply_day2_operations(database_url: str, target_revision: str = "head",
+                          retry_policy: Optional[RetryPolicy] = None,
+                          profiler: Optional[MemoryProfiler] = None,
+                          release_memory: bool = False,
+                          lock_guard: Optional[LockGuard] = None) -> Dict[str, Any]:
     """Apply day-2 operations - main function for Lambda"""
     logger.info(f"Starting day-2 operations with target revision: {target_revision}")
     
-    runner = SimpleMigrationRunner(database_url)
+    runner = SimpleMigrationRunner(
+        database_url, retry_policy=retry_policy, profiler=profiler, lock_guard=lock_guard
+    )
+    runner.memory_checkpoint("runner_constructed")
+    try:
+        result = _apply_with_runner(runner, target_revision)
+    finally:
+        if release_memory:
+            runner.release_resources()
+            runner.memory_checkpoint("after_release")
     
+    if profiler is not None:
+        result['memory'] = profiler.report()
+    return result
+
+
+def _apply_with_runner(runner: SimpleMigrationRunner, target_revision: str) -> Dict[str, Any]:
+    """Check the connection, then migrate"""
     # Check connection
     logger.info("Checking database connection...")
     conn_result = runner.check_connection()
@@ -153,3 +603,45 @@ def apply_day2_operations(database_url: str, target_revision: str = "head") -> D
         logger.error("Day-2 operations failed!")
     
     return result
+
+
+def stream_day2_operations(database_url: str, target_revision: str = "head",
+                           retry_policy: Optional[RetryPolicy] = None,
+                           profiler: Optional[MemoryProfiler] = None,
+                           release_memory: bool = False,
+                           lock_guard: Optional[LockGuard] = None) -> Iterator[Dict[str, Any]]:
+    """Apply day-2 operations, yielding progress events as they happen"""
+    logger.info(f"Starting streamed day-2 operations with target revision: {target_revision}")
+    started = time.monotonic()
+    
+    runner = SimpleMigrationRunner(
+        database_url, retry_policy=retry_policy, profiler=profiler, lock_guard=lock_guard
+    )
+    runner.memory_checkpoint("runner_constructed")
+    
+    finished: Dict[str, Any] = {}
+    try:
+        # Check connection
+        conn_result = runner.check_connection()
+        if not conn_result['success']:
+            logger.error("Database connection failed, aborting migration")
+            finished = {
+                'event': 'run_finished',
+                'elapsed': round(time.monotonic() - started, 3),
+                'result': conn_result
+            }
+        else:
+            for progress in runner.stream_migrations(target_revision):
+                if progress['event'] == 'run_finished':
+                    # Held back until memory has been released and reported
+                    finished = progress
+                else:
+                    yield progress
+    finally:
+        if release_memory:
+            runner.release_resources()
+            runner.memory_checkpoint("after_release")
+    
+    if profiler is not None:
+        finished['result']['memory'] = profiler.report()
+    yield finished
@@ -5,9 +5,13 @@ Simple test script for the database day-2 operations Lambda function
 import json
 import os
 import sys
+import time
 import logging
 import argparse
+import contextlib
+import unittest.mock
 from pathlib import Path
+from typing import Any, Dict, Iterator
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
@@ -18,6 +22,38 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+LOCAL_SECRET: Dict[str, Any] = {
+    'username': 'alembic_user',
+    'password': 'alembic_pass',
+    'host': 'localhost',
+    'port': 5432,
+    'dbname': 'alembic_db'
+}
+
+
+class MockContext:
+    """Mock AWS Lambda context"""
+    def __init__(self, timeout_seconds: float = 900):
+        self.function_name = "test-day2-operations"
+        self.aws_request_id = "test-request-id"
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+@contextlib.contextmanager
+def mock_secrets_manager(secret: Dict[str, Any]) -> Iterator[None]:
+    """Patch boto3 so Secrets Manager returns the given secret"""
+    with unittest.mock.patch('boto3.client') as mock_boto3:
+        mock_secrets_client = unittest.mock.MagicMock()
+        mock_secrets_client.get_secret_value.return_value = {
+            'SecretString': json.dumps(secret)
+        }
+        mock_boto3.return_value = mock_secrets_client
+        yield
+
+
 def test_lambda(target_revision="head"):
     """Test the Lambda function with a local database"""
     from lambda_function import lambda_handler
@@ -53,31 +89,10 @@ def test_lambda(target_revision="head"):
     print("=" * 40)
     
     # Mock AWS context
-    class MockContext:
-        def __init__(self):
-            self.function_name = "test-day2-operations"
-            self.aws_request_id = "test-request-id"
-    
     context = MockContext()
     
     # Mock boto3
-    import unittest.mock
-    
-    mock_secret = {
-        'username': 'alembic_user',
-        'password': 'alembic_pass',
-        'host': 'localhost',
-        'port': 5432,
-        'dbname': 'alembic_db'
-    }
-    
-    with unittest.mock.patch('boto3.client') as mock_boto3:
-        mock_secrets_client = unittest.mock.MagicMock()
-        mock_secrets_client.get_secret_value.return_value = {
-            'SecretString': json.dumps(mock_secret)
-        }
-        mock_boto3.return_value = mock_secrets_client
-        
+    with mock_secrets_manager(LOCAL_SECRET):
         try:
             # Call the Lambda function
             response = lambda_handler(event, context)
@@ -0,0 +1,56 @@
+"""Shared fixtures: a throwaway Alembic environment on SQLite"""
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import pytest
+
+from src.simple_migration_runner import SimpleMigrationRunner
+
+REPO_ENV = Path(__file__).parent.parent / "alembic" / "env.py"
+
+_REVISION_TEMPLATE = '''"""Test revision {revision}"""
+from alembic import op
+
+revision = {revision!r}
+down_revision = {down_revision!r}
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+{body}
+
+
+def downgrade() -> None:
+    pass
+'''
+
+# (revision id, down_revision, statements run through op.execute)
+RevisionSpec = Tuple[str, Optional[str], List[str]]
+
+
+@pytest.fixture
+def make_runner(tmp_path: Path) -> Callable[[List[RevisionSpec]], SimpleMigrationRunner]:
+    """Build a runner on a SQLite file whose script directory holds the given revisions"""
+
+    def _make(revisions: List[RevisionSpec]) -> SimpleMigrationRunner:
+        script_dir = tmp_path / "alembic"
+        (script_dir / "versions").mkdir(parents=True)
+        shutil.copy(REPO_ENV, script_dir / "env.py")
+        for revision, down_revision, statements in revisions:
+            body = "\n".join(f"    op.execute({statement!r})" for statement in statements) or "    pass"
+            (script_dir / "versions" / f"{revision}.py").write_text(
+                _REVISION_TEMPLATE.format(revision=revision, down_revision=down_revision, body=body)
+            )
+        runner = SimpleMigrationRunner(f"sqlite:///{tmp_path / 'test.db'}")
+        runner.alembic_cfg.set_main_option("script_location", str(script_dir))
+        return runner
+
+    return _make
+
+
+@pytest.fixture(autouse=True)
+def no_database_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    # env.py prefers DATABASE_URL over the runner's URL
+    monkeypatch.delenv("DATABASE_URL", raising=False)
@@ -0,0 +1,145 @@
+"""Tests for diffing the declarative access spec against the catalog"""
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from src.access_spec import (
+    REDACTED_PASSWORD,
+    _expand,
+    apply_access_plan,
+    load_access_spec,
+    plan_access_statements,
+)
+
+SPEC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "access_spec.json")
+
+
+@pytest.fixture
+def spec() -> Dict[str, Any]:
+    return load_access_spec(SPEC_PATH)
+
+
+@pytest.fixture
+def migrated_state() -> Dict[str, Any]:
+    """Catalog snapshot of a database upgraded through revisions 001-004"""
+    return {
+        'roles': {
+            'postgres': True, 'app_role': False, 'app_user': True,
+            'analytics_role': False, 'analytics_user': True,
+            'backup_role': False, 'backup_user': True, 'audit_role': False,
+        },
+        'memberships': {
+            ('app_role', 'app_user'), ('analytics_role', 'analytics_user'),
+            ('backup_role', 'backup_user'), ('audit_role', 'app_role'),
+        },
+        'schemas': {
+            'public': {('pg_database_owner', 'USAGE'), ('pg_database_owner', 'CREATE'),
+                       ('backup_role', 'USAGE')},
+            'app_schema': {('postgres', 'USAGE'), ('postgres', 'CREATE'),
+                           ('app_role', 'USAGE'), ('app_role', 'CREATE')},
+            'analytics': {('postgres', 'USAGE'), ('postgres', 'CREATE'),
+                          ('analytics_role', 'USAGE'), ('backup_role', 'USAGE')},
+            'maintenance': {('postgres', 'USAGE'), ('postgres', 'CREATE'),
+                            ('app_role', 'USAGE'), ('app_role', 'CREATE')},
+            'audit': {('postgres', 'USAGE'), ('postgres', 'CREATE'), ('audit_role', 'USAGE')},
+            'pg_catalog': set(),
+        },
+        'relation_counts': {
+            ('public', 'tables'): 1,  # alembic_version
+            ('audit', 'tables'): 2,
+            ('audit', 'sequences'): 2,
+        },
+        'relation_grants': {
+            ('public', 'tables', 'analytics_role', 'SELECT'): 1,
+            ('public', 'tables', 'backup_role', 'SELECT'): 1,
+            ('audit', 'tables', 'audit_role', 'SELECT'): 2,
+            ('audit', 'tables', 'audit_role', 'INSERT'): 2,
+            ('audit', 'tables', 'audit_role', 'UPDATE'): 2,
+            ('audit', 'sequences', 'audit_role', 'USAGE'): 2,
+        },
+        'default_grants': {
+            ('public', 'r', 'analytics_role', 'SELECT'),
+            ('public', 'r', 'backup_role', 'SELECT'),
+            ('analytics', 'r', 'analytics_role', 'SELECT'),
+            ('analytics', 'r', 'backup_role', 'SELECT'),
+            ('audit', 'r', 'audit_role', 'SELECT'),
+            ('audit', 'r', 'audit_role', 'INSERT'),
+            ('audit', 'r', 'audit_role', 'UPDATE'),
+            ('audit', 'S', 'audit_role', 'USAGE'),
+        },
+    }
+
+
+def test_spec_matches_migrated_database(spec: Dict[str, Any], migrated_state: Dict[str, Any]) -> None:
+    plan = plan_access_statements(spec, migrated_state)
+
+    assert plan == {'statements': [], 'secret_statements': []}
+
+
+def test_missing_grant_is_planned(spec: Dict[str, Any], migrated_state: Dict[str, Any]) -> None:
+    migrated_state['default_grants'].discard(('audit', 'S', 'audit_role', 'USAGE'))
+    migrated_state['relation_grants'][('audit', 'tables', 'audit_role', 'UPDATE')] = 1
+
+    plan = plan_access_statements(spec, migrated_state)
+
+    assert plan['statements'] == [
+        'GRANT UPDATE ON ALL TABLES IN SCHEMA audit TO audit_role',
+        'ALTER DEFAULT PRIVILEGES IN SCHEMA audit GRANT USAGE ON SEQUENCES TO audit_role',
+    ]
+
+
+def test_dry_run_does_not_read_passwords(monkeypatch: pytest.MonkeyPatch, spec: Dict[str, Any],
+                                         migrated_state: Dict[str, Any]) -> None:
+    monkeypatch.delenv('APP_USER_PASSWORD', raising=False)
+    del migrated_state['roles']['app_user']
+
+    with pytest.raises(ValueError, match="APP_USER_PASSWORD"):
+        plan_access_statements(spec, migrated_state)
+
+    plan = plan_access_statements(spec, migrated_state, dry_run=True)
+    assert plan['statements'] == ['CREATE ROLE app_user LOGIN']
+    assert plan['secret_statements'] == [("ALTER ROLE app_user PASSWORD %s", (REDACTED_PASSWORD,))]
+
+
+def test_all_expands_per_kind() -> None:
+    assert _expand('schema', ['all']) == ['USAGE', 'CREATE']
+    assert _expand('sequences', ['usage', 'ALL']) == ['USAGE', 'SELECT', 'UPDATE']
+
+
+def test_unknown_privilege_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown tables privilege"):
+        _expand('tables', ['SELECT; DROP TABLE audit.database_changes'])
+    with pytest.raises(ValueError, match="Unknown schema privilege"):
+        _expand('schema', ['SELECT'])
+
+
+def test_password_is_a_bound_parameter(monkeypatch: pytest.MonkeyPatch, spec: Dict[str, Any],
+                                       migrated_state: Dict[str, Any]) -> None:
+    monkeypatch.setenv('APP_USER_PASSWORD', "it's \\secret")
+    del migrated_state['roles']['app_user']
+
+    plan = plan_access_statements(spec, migrated_state)
+
+    assert plan['secret_statements'] == [("ALTER ROLE app_user PASSWORD %s", ("it's \\secret",))]
+
+
+def test_apply_passes_password_to_the_cursor() -> None:
+    executed: List[Any] = []
+    cursor = SimpleNamespace(execute=lambda *args: executed.append(args), close=lambda: None)
+    connection: Any = SimpleNamespace(
+        exec_driver_sql=lambda statement: executed.append((statement,)),
+        connection=SimpleNamespace(cursor=lambda: cursor),
+    )
+    plan = {
+        'statements': ['CREATE ROLE app_user LOGIN', 'GRANT app_role TO app_user'],
+        'secret_statements': [("ALTER ROLE app_user PASSWORD %s", ("pw",))],
+    }
+
+    apply_access_plan(connection, plan)
+
+    assert executed == [
+        ('CREATE ROLE app_user LOGIN;\nGRANT app_role TO app_user',),
+        ('ALTER ROLE app_user PASSWORD %s', ('pw',)),
+    ]
@@ -0,0 +1,94 @@
+"""Tests for lock estimation and blocker detection"""
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import pytest
+
+from src.lock_guard import LockGuard, estimate_locks, find_blockers
+
+
+def test_alter_table_takes_access_exclusive() -> None:
+    sql = "ALTER TABLE audit.database_changes ADD COLUMN note TEXT;"
+
+    assert estimate_locks(sql) == {('audit', 'database_changes'): 'AccessExclusiveLock'}
+
+
+def test_grant_on_all_tables_is_schema_wide() -> None:
+    sql = "GRANT SELECT ON ALL TABLES IN SCHEMA public, analytics TO backup_role;"
+
+    assert estimate_locks(sql) == {
+        ('public', '*'): 'ShareUpdateExclusiveLock',
+        ('analytics', '*'): 'ShareUpdateExclusiveLock',
+    }
+
+
+def test_default_privileges_take_no_relation_lock() -> None:
+    sql = "ALTER DEFAULT PRIVILEGES IN SCHEMA audit GRANT SELECT ON TABLES TO audit_role;"
+
+    assert estimate_locks(sql) == {}
+
+
+def test_lock_statement_mode() -> None:
+    assert estimate_locks("LOCK TABLE audit.compliance_events IN ROW EXCLUSIVE MODE;") == {
+        ('audit', 'compliance_events'): 'RowExclusiveLock'
+    }
+    assert estimate_locks('LOCK "Audit".events;') == {('Audit', 'events'): 'AccessExclusiveLock'}
+
+
+def test_strongest_mode_wins() -> None:
+    sql = (
+        "CREATE INDEX idx_events ON audit.events (created_at);\n"
+        "ALTER TABLE audit.events ADD COLUMN source TEXT;"
+    )
+
+    assert estimate_locks(sql) == {('audit', 'events'): 'AccessExclusiveLock'}
+
+
+def lock_row(relname: str, mode: str, granted: bool = True, xact_age: Optional[float] = 60.0) -> Any:
+    return SimpleNamespace(
+        pid=4242, nspname='public', relname=relname, mode=mode, granted=granted,
+        state='idle in transaction', usename='app_user', xact_age=xact_age, query='SELECT 1'
+    )
+
+
+class FakeConnection:
+    def __init__(self, rows: List[Any]):
+        self.rows = rows
+
+    def execute(self, statement: Any, parameters: Any) -> List[Any]:
+        return self.rows
+
+
+def test_explicit_relation_conflicts_are_blockers() -> None:
+    connection: Any = FakeConnection([
+        lock_row('orders', 'AccessShareLock', xact_age=0.1),
+        lock_row('orders', 'RowExclusiveLock', granted=False, xact_age=0.1),
+    ])
+
+    blockers = find_blockers(connection, {('public', 'orders'): 'AccessExclusiveLock'}, min_blocker_age=5.0)
+
+    assert [blocker['mode'] for blocker in blockers] == ['AccessShareLock', 'RowExclusiveLock']
+
+
+def test_schema_wide_estimate_ignores_short_and_queued_transactions() -> None:
+    connection: Any = FakeConnection([
+        lock_row('orders', 'ShareUpdateExclusiveLock', xact_age=0.5),
+        lock_row('orders', 'ShareLock', granted=False),
+        lock_row('orders', 'AccessShareLock'),
+        lock_row('invoices', 'ShareLock', xact_age=120.0),
+    ])
+
+    blockers = find_blockers(connection, {('public', '*'): 'ShareUpdateExclusiveLock'}, min_blocker_age=5.0)
+
+    assert [blocker['relation'] for blocker in blockers] == ['public.invoices']
+
+
+def test_lock_timeout_accepts_milliseconds() -> None:
+    assert LockGuard(lock_timeout=5000).lock_timeout == '5000ms'
+    assert LockGuard(lock_timeout='2s').lock_timeout == '2s'
+
+
+@pytest.mark.parametrize("lock_timeout", ["5s; DROP TABLE x", 1.5, True, None])
+def test_invalid_lock_timeout(lock_timeout: Any) -> None:
+    with pytest.raises(ValueError, match="Invalid lock_timeout"):
+        LockGuard(lock_timeout=lock_timeout)
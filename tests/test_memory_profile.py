@@ -0,0 +1,84 @@
+"""Tests for memory checkpoints and releasing memory after a run"""
+import tracemalloc
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from src.memory_profile import MemoryProfiler, release_process_memory
+from src.simple_migration_runner import stream_day2_operations
+
+
+@pytest.fixture(autouse=True)
+def no_tracing() -> Iterator[None]:
+    tracemalloc.stop()
+    yield
+    tracemalloc.stop()
+
+
+def test_checkpoint_reports_growth_since_previous() -> None:
+    profiler = MemoryProfiler(top_n=2)
+
+    first = profiler.checkpoint("start")
+    hold: List[bytes] = [bytes(1024) for _ in range(1000)]
+    second = profiler.checkpoint("allocated")
+
+    assert first['label'] == 'start'
+    assert 'top_growth' not in first
+    assert second['traced_mb'] >= first['traced_mb']
+    assert 0 < len(second['top_growth']) <= 2
+    assert __file__ in {stat['file'] for stat in second['top_growth']}
+    assert len(hold) == 1000
+    profiler.stop()
+
+
+def test_report_lists_checkpoints_and_peak() -> None:
+    profiler = MemoryProfiler()
+    profiler.checkpoint("one")
+    profiler.checkpoint("two")
+
+    report = profiler.report()
+
+    assert [entry['label'] for entry in report['checkpoints']] == ['one', 'two']
+    assert report['peak_mb'] >= 0
+    profiler.stop()
+
+
+def test_stop_ends_tracing_it_started() -> None:
+    profiler = MemoryProfiler()
+    assert tracemalloc.is_tracing()
+
+    profiler.stop()
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_stop_keeps_tracing_started_at_import() -> None:
+    # As lambda_function does with MEMORY_PROFILE_IMPORTS=1
+    tracemalloc.start()
+    profiler = MemoryProfiler()
+    profiler.checkpoint("run")
+
+    profiler.stop()
+
+    assert tracemalloc.is_tracing()
+
+
+def test_release_process_memory_runs() -> None:
+    release_process_memory()
+
+
+def test_streamed_connect_failure_keeps_error_and_reports_memory(tmp_path: Path) -> None:
+    profiler = MemoryProfiler()
+    database_url = f"sqlite:///{tmp_path / 'missing' / 'test.db'}"
+
+    events = list(stream_day2_operations(database_url, profiler=profiler, release_memory=True))
+    profiler.stop()
+
+    assert [event['event'] for event in events] == ['run_finished']
+    result = events[0]['result']
+    assert result['success'] is False
+    assert 'unable to open database file' in result['error']
+    assert [entry['label'] for entry in result['memory']['checkpoints']] == [
+        'runner_constructed', 'after_release'
+    ]
@@ -0,0 +1,100 @@
+"""Tests for streamed migration runs and their progress events"""
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from src.simple_migration_runner import _is_bookkeeping, stream_day2_operations
+
+REVISIONS = [
+    ('r1', None, ["CREATE TABLE one (id INTEGER)"]),
+    ('r2', 'r1', ["CREATE TABLE two (id INTEGER)", "INSERT INTO two VALUES (1)", "INSERT INTO two VALUES (2)"]),
+]
+
+
+def event_names(events: List[Dict[str, Any]]) -> List[str]:
+    return [event['event'] for event in events]
+
+
+def test_events_in_order(make_runner: Any) -> None:
+    runner = make_runner(REVISIONS)
+
+    events = list(runner.stream_migrations("head"))
+
+    assert event_names(events) == [
+        'run_started',
+        'revision_started', 'revision_finished',
+        'revision_started', 'revision_finished',
+        'run_finished',
+    ]
+    assert events[0]['pending_migrations'] == ['r1', 'r2']
+    assert [event['revision'] for event in events[1:5]] == ['r1', 'r1', 'r2', 'r2']
+    result = events[-1]['result']
+    assert result['success'] is True
+    assert result['applied_migrations'] == ['r1', 'r2']
+    assert result['final_revision'] == 'r2'
+
+
+def test_statement_count_excludes_version_bookkeeping(make_runner: Any) -> None:
+    runner = make_runner(REVISIONS)
+
+    events = list(runner.stream_migrations("head"))
+
+    counts = {event['revision']: event['statement_count'] for event in events if event['event'] == 'revision_finished'}
+    assert counts == {'r1': 1, 'r2': 3}
+
+
+def test_bookkeeping_statements() -> None:
+    assert _is_bookkeeping("UPDATE alembic_version SET version_num='r2'", {})
+    assert _is_bookkeeping('PRAGMA main.table_info("alembic_version")', ())
+    assert _is_bookkeeping("SELECT relname FROM pg_class WHERE relname = %(table_name)s",
+                           {'table_name': 'alembic_version'})
+    assert _is_bookkeeping("SET LOCAL lock_timeout = '5s'", {})
+    assert not _is_bookkeeping("CREATE TABLE two (id INTEGER)", {})
+
+
+def test_failure_is_carried_by_run_finished(make_runner: Any) -> None:
+    runner = make_runner(REVISIONS + [('r3', 'r2', ["INSERT INTO missing_table VALUES (1)"])])
+
+    events = list(runner.stream_migrations("head"))
+
+    assert event_names(events)[-2:] == ['revision_started', 'run_finished']
+    result = events[-1]['result']
+    assert result['success'] is False
+    assert "no such table" in result['error']
+    assert result['applied_migrations'] == ['r1', 'r2']
+    assert runner._get_current_revision() == 'r2'
+
+
+def test_up_to_date_run(make_runner: Any) -> None:
+    runner = make_runner(REVISIONS)
+    list(runner.stream_migrations("head"))
+
+    events = list(runner.stream_migrations("head"))
+
+    assert event_names(events) == ['run_started', 'run_finished']
+    assert events[-1]['result']['applied_migrations'] == []
+
+
+def test_connect_failure_reports_elapsed(tmp_path: Path) -> None:
+    events = list(stream_day2_operations(f"sqlite:///{tmp_path / 'missing' / 'test.db'}"))
+
+    assert event_names(events) == ['run_finished']
+    assert events[0]['elapsed'] >= 0
+    assert events[0]['result']['success'] is False
+
+
+def test_lambda_collects_progress_events(make_runner: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("boto3")
+    import lambda_function
+
+    runner = make_runner(REVISIONS)
+    monkeypatch.setattr(lambda_function, "stream_day2_operations",
+                        lambda database_url, target_revision, **options: runner.stream_migrations(target_revision))
+
+    result = lambda_function.run_streamed_migration(runner.database_url, "head")
+
+    assert result['success'] is True
+    assert event_names(result['progress_events']) == [
+        'run_started', 'revision_started', 'revision_finished', 'revision_started', 'revision_finished'
+    ]
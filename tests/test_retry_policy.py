@@ -0,0 +1,137 @@
+"""Tests for transient vs fatal error classification and retries"""
+from typing import List, Optional
+
+import pytest
+from sqlalchemy.exc import InterfaceError, OperationalError, ProgrammingError
+
+from src.lock_guard import LockContentionError
+from src.retry_policy import FATAL, TRANSIENT, RetryPolicy, classify_error, error_sqlstate
+from src.simple_migration_runner import SimpleMigrationRunner
+
+
+class DriverError(Exception):
+    """DBAPI error as raised by psycopg2, with an optional SQLSTATE"""
+
+    def __init__(self, message: str, pgcode: Optional[str] = None):
+        super().__init__(message)
+        self.pgcode = pgcode
+
+
+def operational(message: str, pgcode: Optional[str] = None, invalidated: bool = False) -> OperationalError:
+    return OperationalError("SELECT 1", {}, DriverError(message, pgcode), connection_invalidated=invalidated)
+
+
+@pytest.mark.parametrize("sqlstate", ['40001', '40P01', '55P03', '57014', '57P01', '53300', '08006', '08001'])
+def test_transient_sqlstates(sqlstate: str) -> None:
+    assert classify_error(operational("failed", sqlstate)) == TRANSIENT
+
+
+@pytest.mark.parametrize("sqlstate", ['42601', '42P01', '23505', '28P01', '3D000'])
+def test_fatal_sqlstates(sqlstate: str) -> None:
+    assert classify_error(operational("failed", sqlstate)) == FATAL
+
+
+@pytest.mark.parametrize("message", [
+    'connection to server at "127.0.0.1", port 5432 failed: Connection refused',
+    'server closed the connection unexpectedly',
+    'SSL SYSCALL error: EOF detected',
+    'could not receive data from server: Connection reset by peer',
+    'FATAL:  the database system is starting up',
+])
+def test_connection_failures_without_sqlstate_are_transient(message: str) -> None:
+    assert classify_error(operational(message)) == TRANSIENT
+
+
+@pytest.mark.parametrize("message", [
+    'connection to server at "db", port 5432 failed: FATAL:  password authentication failed for user "app"',
+    'connection to server at "db", port 5432 failed: FATAL:  database "nope" does not exist',
+    'FATAL:  no pg_hba.conf entry for host "10.0.0.1", user "app", database "app"',
+    'could not translate host name "db.invalid" to address',
+    'unexpected driver failure',
+])
+def test_auth_and_config_failures_are_fatal(message: str) -> None:
+    assert classify_error(operational(message)) == FATAL
+
+
+def test_invalidated_connection_is_transient() -> None:
+    assert classify_error(operational("unexpected driver failure", invalidated=True)) == TRANSIENT
+
+
+def test_interface_error_closed_connection_is_transient() -> None:
+    error = InterfaceError("SELECT 1", {}, DriverError("connection already closed"))
+    assert classify_error(error) == TRANSIENT
+
+
+def test_sqlstate_found_through_cause_chain() -> None:
+    try:
+        try:
+            raise ProgrammingError("SELECT", {}, DriverError("lock", '55P03'))
+        except ProgrammingError as e:
+            raise RuntimeError("upgrade failed") from e
+    except RuntimeError as wrapped:
+        assert error_sqlstate(wrapped) == '55P03'
+        assert classify_error(wrapped) == TRANSIENT
+
+
+def test_lock_contention_error_is_fatal() -> None:
+    try:
+        try:
+            raise OperationalError("ALTER", {}, DriverError("lock", '55P03'))
+        except OperationalError:
+            raise LockContentionError("gave up") from None
+    except LockContentionError as e:
+        assert error_sqlstate(e) is None
+        assert classify_error(e) == FATAL
+
+
+def test_retry_policy_retries_transient_then_succeeds(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("src.retry_policy.time.sleep", lambda delay: None)
+    calls: List[int] = []
+
+    def flaky() -> str:
+        calls.append(1)
+        if len(calls) < 3:
+            raise operational("server closed the connection unexpectedly")
+        return "ok"
+
+    policy = RetryPolicy(max_attempts=5)
+    assert policy.call(flaky, "flaky") == "ok"
+    assert [retry['attempt'] for retry in policy.retries] == [1, 2]
+
+
+def test_retry_policy_does_not_retry_fatal(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("src.retry_policy.time.sleep", lambda delay: None)
+    calls: List[int] = []
+
+    def bad_password() -> None:
+        calls.append(1)
+        raise operational('FATAL:  password authentication failed for user "app"')
+
+    policy = RetryPolicy(max_attempts=5)
+    with pytest.raises(OperationalError):
+        policy.call(bad_password, "connect")
+    assert len(calls) == 1
+    assert policy.retries == []
+
+
+def test_retry_policy_stops_before_lambda_timeout() -> None:
+    def refused() -> None:
+        raise operational("connection refused")
+
+    policy = RetryPolicy(max_attempts=5, time_remaining_ms=lambda: 5000, safety_margin=10)
+    with pytest.raises(OperationalError):
+        policy.call(refused, "connect")
+    assert policy.retries == []
+
+
+def test_current_heads_failure_is_raised_with_retry_policy(monkeypatch: pytest.MonkeyPatch) -> None:
+    def unreachable() -> None:
+        raise operational('FATAL:  password authentication failed for user "app"')
+
+    runner = SimpleMigrationRunner("sqlite://")
+    monkeypatch.setattr(runner.engine, "connect", unreachable)
+    assert runner._get_current_heads() == ()
+
+    runner.retry_policy = RetryPolicy()
+    with pytest.raises(OperationalError):
+        runner._get_current_heads()
@@ -0,0 +1,112 @@
+"""Tests for revision DAG planning and parallel wave stamping"""
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import pytest
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+
+from src.revision_graph import build_revision_graph, is_merge_point, plan_waves
+from src.simple_migration_runner import SimpleMigrationRunner
+
+
+class FakeScript:
+    """Just enough of ScriptDirectory for the graph helpers"""
+
+    def __init__(self, revisions: Dict[str, Tuple[Union[None, str, Tuple[str, ...]], bool]]):
+        self.revisions = {
+            rev_id: SimpleNamespace(
+                revision=rev_id,
+                down_revision=down_revision,
+                dependencies=None,
+                module=SimpleNamespace(parallel_safe=parallel_safe),
+            )
+            for rev_id, (down_revision, parallel_safe) in revisions.items()
+        }
+
+    def get_revision(self, rev_id: str) -> Optional[Any]:
+        return self.revisions.get(rev_id)
+
+
+@pytest.fixture
+def branched_script() -> Any:
+    # 004 -> (005, 006) -> 007 merges both branches
+    return FakeScript({
+        '004': (None, False),
+        '005': ('004', True),
+        '006': ('004', True),
+        '007': (('005', '006'), True),
+    })
+
+
+def test_plan_waves_groups_independent_branches(branched_script: Any) -> None:
+    graph = build_revision_graph(branched_script, ['005', '006', '007'])
+
+    assert plan_waves(graph) == [['005', '006'], ['007']]
+
+
+def test_plan_waves_detects_cycles() -> None:
+    with pytest.raises(ValueError, match="Cycle detected"):
+        plan_waves({'a': {'b'}, 'b': {'a'}, 'c': set()})
+
+
+def test_merge_point_is_never_parallel(branched_script: Any) -> None:
+    runner = SimpleMigrationRunner("sqlite://")
+
+    assert is_merge_point(branched_script, '007')
+    assert runner._parallel_group(branched_script, ['005', '006']) == ['005', '006']
+    assert runner._parallel_group(branched_script, ['007']) == []
+
+
+def test_sibling_stamps_replace_shared_parent() -> None:
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        context = MigrationContext.configure(connection)
+        context._version.create(connection)
+        connection.execute(context._version.insert().values(version_num='004'))
+
+        SimpleMigrationRunner._stamp_revision(context, '005', ('004',))
+        SimpleMigrationRunner._stamp_revision(context, '006', ('004',))
+
+        assert sorted(context.get_current_heads()) == ['005', '006']
+
+
+def test_applied_revision_is_detected_before_a_retry(make_runner: Any) -> None:
+    runner = make_runner([
+        ('a1', None, ["CREATE TABLE one (id INTEGER)"]),
+        ('b1', 'a1', ["CREATE TABLE two (id INTEGER)"]),
+        ('c1', 'a1', ["CREATE TABLE three (id INTEGER)"]),
+    ])
+    script = ScriptDirectory.from_config(runner.alembic_cfg)
+    runner._ensure_version_table()
+
+    with runner.engine.begin() as connection:
+        context = MigrationContext.configure(connection)
+        assert not runner._is_applied(script, context, 'a1')
+        SimpleMigrationRunner._stamp_revision(context, 'a1', ())
+        SimpleMigrationRunner._stamp_revision(context, 'b1', ('a1',))
+
+        # A retried worker must skip its own head and anything below a head
+        assert runner._is_applied(script, context, 'b1')
+        assert runner._is_applied(script, context, 'a1')
+        assert not runner._is_applied(script, context, 'c1')
+
+
+def test_worker_rerun_of_committed_revision_succeeds(make_runner: Any) -> None:
+    runner = make_runner([
+        ('a1', None, []),
+        ('b1', 'a1', ["CREATE TABLE two (id INTEGER)"]),
+    ])
+    script = ScriptDirectory.from_config(runner.alembic_cfg)
+    runner._ensure_version_table()
+    sent: List[Dict[str, Any]] = []
+    pipe = SimpleNamespace(send=sent.append, close=lambda: None)
+
+    runner._apply_revision_worker(script, 'a1', pipe)
+    runner._apply_revision_worker(script, 'b1', pipe)
+    # Same revision again, as a retry after a lost COMMIT acknowledgement would
+    runner._apply_revision_worker(script, 'b1', pipe)
+
+    assert [outcome['success'] for outcome in sent] == [True, True, True]
+    assert runner._get_current_heads() == ('b1',)